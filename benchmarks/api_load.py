@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable
+from httpx import ASGITransport, AsyncClient, Response
+from tests.seeder import Seeder
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+PERCENTILES = (50, 95, 99)
+TEXT_QUERIES = [
+    *(title.lower() for title in Seeder.RECIPE_TITLES),
+    *(ingredient.lower() for ingredient in Seeder.RECIPE_INGREDIENTS),
+    'борщ со свеклой', 'паста -сыр', '"салат оливье"'
+]
+# relative weights of the mixed workload
+WORKLOAD = {
+    'list': 20,
+    'filter_category': 15,
+    'filter_time': 15,
+    'filter_text': 15,
+    'detail': 25,
+    'create': 5,
+    'update': 5
+}
+
+
+@dataclass
+class Context:
+    token: str
+    categories: list[int]
+    ingredients: list[int]
+    min_id: int
+    max_id: int
+    total: int
+    created: list[int] = field(default_factory=list)
+
+    @property
+    def headers(self) -> dict:
+        return {'Authorization': f'Bearer {self.token}'}
+
+    def recipe(self, rng: random.Random) -> dict:
+        return {
+            'title': f'{rng.choice(Seeder.RECIPE_TITLES)} {rng.randint(1, 10_000)}',
+            'description': rng.choice(Seeder.RECIPE_DESC),
+            'cooking_time': rng.choice(Seeder.RECIPE_COOK_TIME),
+            'categories': rng.sample(self.categories, min(2, len(self.categories))),
+            'ingredients': rng.sample(self.ingredients, min(5, len(self.ingredients)))
+        }
+
+
+Operation = Callable[[AsyncClient, Context, random.Random], Awaitable[Response]]
+
+
+async def list_recipes(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    return await client.get('/recipes/list', params={'page': rng.randint(1, 20), 'page_size': 20})
+
+
+async def filter_category(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    return await client.get('/recipes/list/filter', params={'categories': rng.choice(ctx.categories), 'page_size': 20})
+
+
+async def filter_time(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    low = rng.choice(Seeder.RECIPE_COOK_TIME)
+    return await client.get('/recipes/list/filter', params={
+        'min_time': low, 'max_time': low * 2, 'sort': 'cooking_time', 'page_size': 20
+    })
+
+
+async def filter_text(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    return await client.get('/recipes/list/filter', params={'q': rng.choice(TEXT_QUERIES), 'page_size': 20})
+
+
+async def detail(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    return await client.get(f'/recipes/{rng.randint(ctx.min_id, ctx.max_id)}')
+
+
+async def create(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    response = await client.post('/recipes/add', json=ctx.recipe(rng), headers=ctx.headers)
+    if response.status_code == 200:
+        ctx.created.append(response.json()['id'])
+    return response
+
+
+async def update(client: AsyncClient, ctx: Context, rng: random.Random) -> Response:
+    # only the benchmark user's own recipes may be edited
+    if not ctx.created:
+        return await create(client, ctx, rng)
+    data = ctx.recipe(rng)
+    return await client.patch(f'/recipes/{rng.choice(ctx.created)}', json={
+        'title': data['title'], 'cooking_time': data['cooking_time'], 'ingredients': data['ingredients']
+    }, headers=ctx.headers)
+
+
+OPERATIONS: dict[str, Operation] = {
+    'list': list_recipes,
+    'filter_category': filter_category,
+    'filter_time': filter_time,
+    'filter_text': filter_text,
+    'detail': detail,
+    'create': create,
+    'update': update
+}
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int | None
+    queries: int | None = None
+    db: float | None = None
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    # nearest-rank on sorted values
+    if not values:
+        return None
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarise(samples: list[Sample], elapsed: float) -> dict:
+    latencies = sorted(sample.latency * 1000 for sample in samples)
+    queries = [sample.queries for sample in samples if sample.queries is not None]
+    db = sorted(sample.db for sample in samples if sample.db is not None)
+    return {
+        'requests': len(samples),
+        # the API answers empty results and missing recipes with 404, which is not a failure here
+        'not_found': sum(1 for sample in samples if sample.status == 404),
+        'errors': sum(
+            1 for sample in samples if sample.status is None or (sample.status >= 400 and sample.status != 404)
+        ),
+        'throughput': round(len(samples) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            **{f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+            'max': latencies[-1] if latencies else None
+        },
+        # from the Server-Timing header, absent when the server runs with METRICS_ENABLED=false
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'db_ms_p50': percentile(db, 50)
+    }
+
+
+async def worker(client: AsyncClient, ctx: Context, rng: random.Random, warmup_until: float, deadline: float,
+                 samples: dict[str, list[Sample]]):
+    names, weights = list(WORKLOAD), list(WORKLOAD.values())
+    while (now := time.perf_counter()) < deadline:
+        name = rng.choices(names, weights)[0]
+        try:
+            response = await OPERATIONS[name](client, ctx, rng)
+        except Exception:
+            sample = Sample(time.perf_counter() - now, None)
+        else:
+            sample = Sample(time.perf_counter() - now, response.status_code)
+            timing = SERVER_TIMING_DB.search(response.headers.get('server-timing', ''))
+            if timing:
+                sample.db, sample.queries = float(timing.group(1)), int(timing.group(2))
+        if now >= warmup_until:
+            samples[name].append(sample)
+
+
+async def prepare(client: AsyncClient) -> Context:
+    user = {'email': f'bench{time.time_ns()}@bench.run', 'password': Seeder.AUTHOR_DATA['password']}
+    response = await client.post('/users/register', json=user)
+    response.raise_for_status()
+    response = await client.post('/users/login', json=user)
+    response.raise_for_status()
+    token = response.json()['access_token']
+    categories = [item['id'] for item in (await client.get('/recipes/categories')).json()]
+    ingredients = [item['id'] for item in (await client.get('/recipes/ingredients')).json()]
+    first = (await client.get('/recipes/list', params={'page_size': 1})).json()
+    last = (await client.get('/recipes/list', params={'page_size': 1, 'sort': 'newest'})).json()
+    if not first['items'] or not categories or not ingredients:
+        raise SystemExit('The database is empty, seed it first: python -m benchmarks.dataset')
+    return Context(
+        token=token,
+        categories=categories,
+        ingredients=ingredients,
+        min_id=first['items'][0]['id'],
+        max_id=last['items'][0]['id'],
+        total=first['total']
+    )
+
+
+@asynccontextmanager
+async def make_client(url: str | None, cache: bool) -> AsyncIterator[AsyncClient]:
+    if url:
+        async with AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+    from src.core.cache import response_cache
+    from src.main import app
+    response_cache.enabled = cache
+    # in-process run against the ASGI app, with the same startup and shutdown as uvicorn
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://bench', timeout=60) as client:
+            yield client
+
+
+def commit() -> str | None:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    async with make_client(args.url, cache=not args.no_cache) as client:
+        ctx = await prepare(client)
+        samples = {name: [] for name in WORKLOAD}
+        started = time.perf_counter()
+        warmup_until = started + args.warmup
+        deadline = warmup_until + args.duration
+        await asyncio.gather(*(
+            worker(client, ctx, random.Random(rng.random()), warmup_until, deadline, samples)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - warmup_until
+    return {
+        'commit': commit(),
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'target': args.url or 'asgi',
+        'concurrency': args.concurrency,
+        'duration': round(elapsed, 3),
+        'warmup': args.warmup,
+        'response_cache': not args.no_cache,
+        'seed': args.seed,
+        'dataset': {'recipes': ctx.total, 'categories': len(ctx.categories), 'ingredients': len(ctx.ingredients)},
+        'endpoints': {name: summarise(endpoint_samples, elapsed) for name, endpoint_samples in samples.items()},
+        'total': summarise([sample for endpoint_samples in samples.values() for sample in endpoint_samples], elapsed)
+    }
+
+
+def print_report(result: dict):
+    print(f"{result['commit']}  {result['target']}  {result['dataset']['recipes']} recipes  "
+          f"concurrency {result['concurrency']}  {result['duration']:.1f}s")
+    print(f"{'endpoint':<18}{'requests':>10}{'404':>6}{'errors':>8}{'req/s':>10}{'p50, ms':>10}{'p95, ms':>10}"
+          f"{'p99, ms':>10}{'queries':>9}")
+    for name, stats in [*result['endpoints'].items(), ('total', result['total'])]:
+        latency = stats['latency_ms']
+        print(f"{name:<18}{stats['requests']:>10}{stats['not_found']:>6}{stats['errors']:>8}{stats['throughput']:>10.1f}"
+              f"{format_ms(latency['p50']):>10}{format_ms(latency['p95']):>10}{format_ms(latency['p99']):>10}"
+              f"{format_ms(stats['queries_per_request']):>9}")
+
+
+def format_ms(value: float | None) -> str:
+    return '-' if value is None else f'{value:.1f}'
+
+
+def change(base: float | None, head: float | None) -> str:
+    if base is None or head is None:
+        return '-'
+    return f'{(head - base) / base * 100:+.1f}%' if base else '-'
+
+
+def compare(base: dict, head: dict):
+    print(f"{base['commit']} -> {head['commit']}")
+    print(f"{'endpoint':<18}{'req/s':>20}{'change':>9}{'p95, ms':>20}{'change':>9}{'queries':>14}")
+    for name in [*base['endpoints'], 'total']:
+        old = base['total'] if name == 'total' else base['endpoints'].get(name)
+        new = head['total'] if name == 'total' else head['endpoints'].get(name)
+        if old is None or new is None:
+            continue
+        old_p95, new_p95 = old['latency_ms']['p95'], new['latency_ms']['p95']
+        print(f"{name:<18}{old['throughput']:>9.1f} -> {new['throughput']:<7.1f}"
+              f"{change(old['throughput'], new['throughput']):>9}"
+              f"{format_ms(old_p95):>9} -> {format_ms(new_p95):<7}{change(old_p95, new_p95):>9}"
+              f"{format_ms(old['queries_per_request']):>6} -> {format_ms(new['queries_per_request']):<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-workload load test for the recipe API')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='drive the workload and store the results as JSON')
+    run_parser.add_argument('--url', help='base URL of a running server, the ASGI app is driven in-process by default')
+    run_parser.add_argument('--concurrency', type=int, default=32)
+    run_parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='seconds before measuring starts')
+    run_parser.add_argument('--no-cache', action='store_true', help='disable the response cache (in-process only)')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', help=f'JSON file, defaults to {RESULTS_DIR}/<time>-<commit>.json')
+    compare_parser = commands.add_parser('compare', help='compare two stored results')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.base) as base, open(args.head) as head:
+            compare(json.load(base), json.load(head))
+        return
+    result = asyncio.run(run(args))
+    print_report(result)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['commit'] or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f'saved to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import random
+import time
+from sqlalchemy import insert, select, text
+from src.core.text import html_to_text
+from src.db.engine import engine
+from src.db.models import Recipe, RecipeCategory, RecipeIngredient, RecipeCategoryValue, RecipeIngredientValue, User
+from src.db.session import scoped_session
+from src.recipes.search import backfill
+from src.users.passwords import password_hasher
+from tests.seeder import Seeder
+
+BATCH_SIZE = 2000
+EMAIL_DOMAIN = 'bench.seed'
+TITLE_QUALIFIERS = ['по-домашнему', 'по-итальянски', 'на скорую руку', 'с зеленью', 'с сыром', 'по рецепту бабушки']
+CATEGORIES_PER_RECIPE = (1, 3)
+INGREDIENTS_PER_RECIPE = (3, 10)
+
+
+def reference_names(words: list[str], count: int) -> list[str]:
+    # the seeder word lists are short, numbered variants bring them to a realistic size
+    names = list(words)
+    for i in range(count - len(names)):
+        names.append(f'{words[i % len(words)]} {i // len(words) + 2}')
+    return names[:max(count, len(words))]
+
+
+async def ensure_references(model, names: list[str]) -> dict[int, str]:
+    async with scoped_session() as session:
+        existing = set((await session.execute(select(model.name))).scalars())
+        missing = [{'name': name} for name in names if name not in existing]
+        if missing:
+            await session.execute(insert(model), missing)
+            await session.commit()
+        return dict((await session.execute(select(model.id, model.name).where(model.name.in_(names)))).all())
+
+
+async def ensure_authors(count: int) -> list[int]:
+    emails = [f'author{i}@{EMAIL_DOMAIN}' for i in range(count)]
+    async with scoped_session() as session:
+        existing = set((await session.execute(select(User.email).where(User.email.in_(emails)))).scalars())
+        if len(existing) < count:
+            # one hash for every author, argon2 is deliberately slow
+            password = await password_hasher.hash(Seeder.AUTHOR_DATA['password'])
+            await session.execute(insert(User), [
+                {'email': email, 'password': password} for email in emails if email not in existing
+            ])
+            await session.commit()
+        return list((await session.execute(select(User.id).where(User.email.in_(emails)))).scalars())
+
+
+async def seed(recipes: int, authors: int, categories: int, ingredients: int, batch_size: int = BATCH_SIZE):
+    category_names = await ensure_references(RecipeCategory, reference_names(Seeder.RECIPE_CATEGORIES, categories))
+    ingredient_names = await ensure_references(RecipeIngredient, reference_names(Seeder.RECIPE_INGREDIENTS, ingredients))
+    author_ids = await ensure_authors(authors)
+    descriptions = {description: html_to_text(description) for description in Seeder.RECIPE_DESC}
+    category_ids, ingredient_ids = list(category_names), list(ingredient_names)
+
+    started = time.perf_counter()
+    for offset in range(0, recipes, batch_size):
+        rows, links = [], []
+        for _ in range(min(batch_size, recipes - offset)):
+            title = f'{random.choice(Seeder.RECIPE_TITLES)} {random.choice(TITLE_QUALIFIERS)}'
+            description = random.choice(Seeder.RECIPE_DESC)
+            recipe_categories = random.sample(category_ids, random.randint(*CATEGORIES_PER_RECIPE))
+            recipe_ingredients = random.sample(ingredient_ids, random.randint(*INGREDIENTS_PER_RECIPE))
+            rows.append({
+                'title': title,
+                'description': description,
+                'cooking_time': random.choice(Seeder.RECIPE_COOK_TIME),
+                'author_id': random.choice(author_ids),
+                'description_text': descriptions[description],
+                'searchable_content': ' '.join([
+                    title.lower(),
+                    descriptions[description].lower(),
+                    *(category_names[i].lower() for i in recipe_categories),
+                    *(ingredient_names[i].lower() for i in recipe_ingredients)
+                ])
+            })
+            links.append((recipe_categories, recipe_ingredients))
+        async with scoped_session() as session:
+            ids = (await session.execute(
+                insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True), rows
+            )).scalars().all()
+            await session.execute(insert(RecipeCategoryValue), [
+                {'recipe_id': recipe_id, 'category_id': category_id}
+                for recipe_id, (recipe_categories, _) in zip(ids, links) for category_id in recipe_categories
+            ])
+            await session.execute(insert(RecipeIngredientValue), [
+                {'recipe_id': recipe_id, 'ingredient_id': ingredient_id}
+                for recipe_id, (_, recipe_ingredients) in zip(ids, links) for ingredient_id in recipe_ingredients
+            ])
+            await session.commit()
+        done = offset + len(rows)
+        print(f'\rrecipes: {done}/{recipes} ({done / (time.perf_counter() - started):.0f}/s)', end='', flush=True)
+    print()
+    print(f'search vectors: {await backfill()}')
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('ANALYZE'))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Bulk-seed a benchmark dataset')
+    parser.add_argument('--recipes', type=int, default=100_000)
+    parser.add_argument('--authors', type=int, default=100)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=None, help='random seed for a reproducible dataset')
+    args = parser.parse_args()
+    random.seed(args.seed)
+    try:
+        await seed(args.recipes, args.authors, args.categories, args.ingredients, args.batch_size)
+    finally:
+        password_hasher.shutdown()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
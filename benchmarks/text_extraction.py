@@ -0,0 +1,37 @@
+import re
+import timeit
+from src.core.text import html_to_text
+from tests.seeder import Seeder
+
+LEGACY_HTML_CLEANER_REGEX = re.compile('<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6}|\\t);')
+REPEAT = 3
+
+
+def legacy(html: str) -> str:
+    return re.sub(LEGACY_HTML_CLEANER_REGEX, '', html.lower())
+
+
+def extractor(html: str) -> str:
+    return html_to_text(html).lower()
+
+
+def main():
+    samples = {
+        'seeder': Seeder.RECIPE_DESC,
+        'seeder x50': [''.join(Seeder.RECIPE_DESC) * 50],
+        'unclosed tags': ['<p ' + 'a' * 200_000],
+        'stray brackets': ['<a ' * 4_000],
+    }
+    print(f"{'sample':<16}{'size':>10}{'regex, ms':>14}{'scanner, ms':>14}")
+    for name, htmls in samples.items():
+        size = sum(map(len, htmls))
+        results = []
+        for func in (legacy, extractor):
+            timer = timeit.Timer(lambda: [func(html) for html in htmls])
+            number, _ = timer.autorange()
+            results.append(min(timer.repeat(REPEAT, number)) / number * 1000)
+        print(f'{name:<16}{size:>10}{results[0]:>14.2f}{results[1]:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
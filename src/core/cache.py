@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Protocol
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from src.core.lru import TTLCache
+from src.core.timing import timed
+from src.db.config import config
+from src.db.session import primary_session, scoped_session
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    fresh_until: float
+    stale_until: float
+    tags: tuple[str, ...] = field(default_factory=tuple)
+
+
+class CacheBackend(Protocol):
+
+    async def get(self, key: str) -> CacheEntry | None: ...
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float): ...
+
+    async def invalidate_tags(self, *tags: str): ...
+
+    def stats(self) -> dict: ...
+
+
+class MemoryCacheBackend:
+
+    def __init__(self, max_size: int):
+        # expired and evicted entries leave the tag index with the cache, so it only holds live keys
+        self._cache = TTLCache(max_size=max_size, ttl=float('inf'), on_remove=self._untag)
+        self._tags: dict[str, set[str]] = {}
+
+    def _untag(self, key: str, entry: CacheEntry):
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> CacheEntry | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float):
+        self._cache.set(key, entry, ttl=ttl)
+        if key in self._cache:
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate_tags(self, *tags: str):
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._cache.delete(key)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class ResponseCache:
+
+    def __init__(self, backend: CacheBackend, ttl: float, stale_ttl: float, enabled: bool = True,
+                 primary_window: float = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.enabled = enabled
+        self.primary_window = primary_window
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._generations: dict[str, int] = {}
+        self._building = 0
+        self._invalidated_at: dict[str, float] = {}
+
+    @staticmethod
+    def key(namespace: str, params: dict) -> str:
+        normalised = {
+            name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+            for name, value in params.items()
+        }
+        return f'{namespace}:{json.dumps(normalised, sort_keys=True, default=str)}'
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    async def invalidate(self, *tags: str):
+        now = time.monotonic()
+        self._invalidated_at = {
+            tag: at for tag, at in self._invalidated_at.items() if now - at < self.primary_window
+        }
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._invalidated_at[tag] = now
+        await self.backend.invalidate_tags(*tags)
+
+    def pinned(self, tags: tuple[str, ...]) -> bool:
+        # a replica may not have the write behind an invalidation yet, caching its answer would keep it for a TTL
+        now = time.monotonic()
+        return any(
+            now - self._invalidated_at[tag] < self.primary_window for tag in tags if tag in self._invalidated_at
+        )
+
+    async def _build(self, key: str, compute: Callable[[], Awaitable[bytes]], tags: tuple[str, ...]) -> CacheEntry:
+        # a body read before an invalidation must not be stored after it
+        generations = [self._generations.get(tag, 0) for tag in tags]
+        self._building += 1
+        try:
+            if self.pinned(tags):
+                async with primary_session():
+                    body = await compute()
+            else:
+                body = await compute()
+        finally:
+            self._building -= 1
+        invalidated = generations != [self._generations.get(tag, 0) for tag in tags]
+        if not self._building:
+            # counters are only compared against snapshots of builds in flight
+            self._generations.clear()
+        now = time.monotonic()
+        entry = CacheEntry(
+            body=body,
+            etag=self.etag(body),
+            fresh_until=now + self.ttl,
+            stale_until=now + self.ttl + self.stale_ttl,
+            tags=tags
+        )
+        if not invalidated:
+            await self.backend.set(key, entry, ttl=self.ttl + self.stale_ttl)
+        return entry
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[bytes]], tags: tuple[str, ...]) -> CacheEntry:
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await self._build(key, compute, tags)
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception as retrieved, it is re-raised to this caller anyway
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+        finally:
+            # a cancelled leader sets neither, followers must not wait for it forever
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
+        return entry
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[bytes]], tags: tuple[str, ...]):
+        # runs after the request is gone, so it must not reuse the request session
+        try:
+            async with scoped_session():
+                await self._build(key, compute, tags)
+        except Exception:
+            pass
+        finally:
+            self._refreshing.pop(key, None)
+
+    def respond(self, request: Request, entry: CacheEntry, status: str) -> Response:
+        headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache', 'X-Cache': status}
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match and (if_none_match.strip() == '*' or entry.etag in (
+                tag.strip().removeprefix('W/') for tag in if_none_match.split(','))):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type='application/json', headers=headers)
+
+    def cached(self, endpoint: Callable, response_model: Any, namespace: str,
+               tags: Callable[[dict], list[str]]) -> Callable:
+        adapter = TypeAdapter(response_model)
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*, cache_request: Request, **params):
+            async def compute() -> bytes:
+                result = await endpoint(**params)
+                with timed('serialize'):
+                    return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+            if not self.enabled:
+                body = await compute()
+                return self.respond(cache_request, CacheEntry(body, self.etag(body), 0, 0), 'BYPASS')
+
+            key = self.key(namespace, params)
+            entry = await self.backend.get(key)
+            now = time.monotonic()
+            if entry is not None and now < entry.fresh_until:
+                return self.respond(cache_request, entry, 'HIT')
+            if entry is not None and now < entry.stale_until:
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, compute, tuple(tags(params))))
+                return self.respond(cache_request, entry, 'STALE')
+            entry = await self._load(key, compute, tuple(tags(params)))
+            return self.respond(cache_request, entry, 'MISS')
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter('cache_request', inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        ])
+        return wrapper
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+response_cache = ResponseCache(
+    MemoryCacheBackend(max_size=config.RESPONSE_CACHE_SIZE),
+    ttl=config.RESPONSE_CACHE_TTL,
+    stale_ttl=config.RESPONSE_CACHE_STALE_TTL,
+    enabled=config.RESPONSE_CACHE_ENABLED,
+    # a lagging replica is only taken out of rotation at the next health check
+    primary_window=config.DB_REPLICA_MAX_LAG + config.DB_REPLICA_HEALTH_INTERVAL
+)
@@ -0,0 +1,21 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement, analyze: bool = False, buffers: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+        self.buffers = buffers
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element: Explain, compiler, **kw):
+    options = ['FORMAT JSON']
+    if element.analyze:
+        options.append('ANALYZE')
+    if element.buffers:
+        options.append('BUFFERS')
+    return f'EXPLAIN ({", ".join(options)}) {compiler.process(element.statement, **kw)}'
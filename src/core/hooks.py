@@ -0,0 +1,15 @@
+from collections import defaultdict
+from typing import Callable, Type
+
+from src.core.models import Base as BaseModel
+
+_listeners: dict[type, list[Callable[[], None]]] = defaultdict(list)
+
+
+def on_write(model: Type[BaseModel], listener: Callable[[], None]):
+    _listeners[model].append(listener)
+
+
+def notify_write(model: Type[BaseModel]):
+    for listener in _listeners.get(model, ()):
+        listener()
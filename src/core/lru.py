@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator
+
+
+class TTLCache:
+
+    def __init__(self, max_size: int, ttl: float, on_remove: Callable[[Hashable, Any], None] | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._items.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                self.delete(key)
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self.delete(key)
+        self._items[key] = (time.monotonic() + ttl, value)
+        while len(self._items) > self.max_size:
+            self.delete(next(iter(self._items)))
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        item = self._items.pop(key, None)
+        if item is not None and self.on_remove is not None:
+            self.on_remove(key, item[1])
+
+    def delete_where(self, predicate: Callable[[Any], bool]):
+        for key in [key for key, (_, value) in self._items.items() if predicate(value)]:
+            self.delete(key)
+
+    def clear(self):
+        for key in list(self._items):
+            self.delete(key)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._items))
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
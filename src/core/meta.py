@@ -1,3 +0,0 @@
-from sqlalchemy import MetaData
-
-base_metadata = MetaData()
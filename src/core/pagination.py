@@ -0,0 +1,40 @@
+import base64
+import json
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import ColumnElement
+
+# JSON has one number type, a float key may come back as an int; bool is an int subclass but never a key
+CURSOR_VALUE_TYPES = {int: (int,), float: (int, float), str: (str,)}
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    payload = json.dumps({'s': sort, 'k': values}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, types: list[type]) -> list:
+    # a well-formed but tampered cursor must fail here, not as a DataError from the driver
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = payload['k']
+        if payload['s'] != sort or not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        for value, value_type in zip(values, types):
+            if isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES[value_type]):
+                raise ValueError
+    except Exception:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return values
+
+
+def keyset_order(keys: list[tuple[ColumnElement, bool]]) -> list[ColumnElement]:
+    return [column.desc() if descending else column.asc() for column, descending in keys]
+
+
+def keyset_after(keys: list[tuple[ColumnElement, bool]], values: list) -> ColumnElement:
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column < values[i] if descending else column > values[i]))
+    return or_(*clauses)
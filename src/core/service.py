@@ -1,54 +1,65 @@
+import json
+from contextlib import asynccontextmanager
 from sqlalchemy import insert, select, delete, update
-from sqlalchemy.orm import Session
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlalchemy.sql import Select
 
-from typing import Type
+from typing import AsyncIterator, Sequence, Type
 
 from src.core.models import Base as BaseModel
-from src.db.engine import engine
-from src.core.meta import base_metadata
+from src.core.explain import Explain
+from src.core.hooks import notify_write
+from src.core.uow import UnitOfWork
+from src.db.session import current_session
 
 
 class BaseService:
 
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWork]:
+        async with current_session() as session:
+            uow = UnitOfWork(session)
+            try:
+                yield uow
+                await uow.flush()
+            except Exception:
+                await session.rollback()
+                raise
+            await session.commit()
+            uow.committed()
+
     async def create(self, model: Type[BaseModel], values: dict):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
         res = False
         stmt = insert(model).values(values).returning(model)
-        async with async_session() as session:
-            async with session.begin():
-                try:
-                    res = await session.execute(stmt)
-                except Exception:
-                    await session.rollback()
-                else:
-                    await session.commit()
-        await engine.dispose()
-        if res:
-            return res.scalar_one()
+        async with current_session() as session:
+            try:
+                res = (await session.execute(stmt)).scalar_one()
+            except Exception:
+                await session.rollback()
+                return False
+            await session.commit()
+            session.expunge(res)
+        notify_write(model)
         return res
 
     async def update(self, model: Type[BaseModel], values: dict, pk: int):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
+        res = False
         stmt = update(model).where(model.id == pk).values(values).returning(model)
-        async with async_session() as session:
-            async with session.begin():
-                try:
-                    res = await session.execute(stmt)
-                except Exception:
-                    await session.rollback()
-                else:
-                    await session.commit()
-        await engine.dispose()
-        if res:
-            return res.scalar_one()
+        async with current_session() as session:
+            try:
+                res = (await session.execute(stmt)).scalar_one()
+            except Exception:
+                await session.rollback()
+                return False
+            await session.commit()
+            session.expunge(res)
+        notify_write(model)
         return res
 
-    async def get_one(self, model: Type[BaseModel], filter: dict):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
+    async def get_one(self, model: Type[BaseModel], filter: dict, options: Sequence[ORMOption] = ()):
         res = False
-        stmt = select(model).filter_by(**filter)
-        async with async_session() as session:
+        stmt = select(model).filter_by(**filter).options(*options).execution_options(populate_existing=True)
+        async with current_session() as session:
             row = await session.execute(stmt)
             try:
                 res = row.scalar_one()
@@ -56,11 +67,10 @@ class BaseService:
                 return False
         return res
 
-    async def get_list(self, model: Type[BaseModel]):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
+    async def get_list(self, model: Type[BaseModel], options: Sequence[ORMOption] = ()):
         res = []
-        stmt = select(model)
-        async with async_session() as session:
+        stmt = select(model).options(*options).execution_options(populate_existing=True)
+        async with current_session() as session:
             row = await session.execute(stmt)
             try:
                 res = row.scalars().all()
@@ -69,17 +79,28 @@ class BaseService:
         return res
 
     async def delete(self, model: Type[BaseModel], pk: int):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
         stmt = delete(model).where(model.id == pk)
         result = False
-        async with async_session() as session:
+        async with current_session() as session:
             try:
                 await session.execute(stmt)
                 result = True
             except Exception:
                 await session.rollback()
-            else:
-                await session.commit()
-        await engine.dispose()
+                return False
+            await session.commit()
+        notify_write(model)
         return result
 
+    async def estimate_count(self, stmt: Select) -> int | None:
+        async with current_session() as session:
+            try:
+                # a savepoint keeps the request transaction usable if the EXPLAIN fails, e.g. on a timeout
+                async with session.begin_nested():
+                    # through the session, so it is routed to a replica like the page query
+                    plan = (await session.execute(Explain(stmt))).scalar_one()
+            except Exception:
+                return None
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,103 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, Iterator
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+MAX_ITEM_SIZE = 10 * 1024 * 1024
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+class JSONItemsParser:
+
+    def __init__(self, max_item_size: int = MAX_ITEM_SIZE):
+        self.max_item_size = max_item_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._mode: str | None = None
+        self._expect_separator = False
+        self._closed = False
+
+    def feed(self, chunk: bytes, final: bool = False) -> Iterator[tuple[Any, str | None]]:
+        self._buffer += self._decoder.decode(chunk, final=final)
+        if self._mode is None:
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                return
+            self._mode = 'array' if stripped[0] == '[' else 'lines'
+            self._buffer = stripped[1:] if self._mode == 'array' else stripped
+        if self._mode == 'lines':
+            yield from self._lines(final)
+        else:
+            yield from self._array(final)
+
+    def _lines(self, final: bool) -> Iterator[tuple[Any, str | None]]:
+        lines = self._buffer.split('\n')
+        self._buffer = '' if final else lines.pop()
+        if len(self._buffer) > self.max_item_size:
+            raise StreamFormatError('Line is too long')
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, f'Invalid JSON: {e}'
+
+    def _array(self, final: bool) -> Iterator[tuple[Any, str | None]]:
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if self._closed:
+                if self._buffer:
+                    raise StreamFormatError('Unexpected data after the end of the array')
+                return
+            if not self._buffer:
+                break
+            if self._buffer[0] == ']':
+                self._closed = True
+                self._buffer = self._buffer[1:]
+                continue
+            if self._expect_separator:
+                if self._buffer[0] != ',':
+                    raise StreamFormatError('Expected "," between array items')
+                self._buffer = self._buffer[1:]
+                self._expect_separator = False
+                continue
+            try:
+                item, end = self._json.raw_decode(self._buffer)
+            except ValueError as e:
+                if final or len(self._buffer) > self.max_item_size:
+                    raise StreamFormatError(f'Invalid JSON: {e}')
+                break
+            # a value that ends exactly at the buffer edge (e.g. a number) may still continue in the next chunk
+            if end == len(self._buffer) and not final:
+                break
+            self._buffer = self._buffer[end:]
+            self._expect_separator = True
+            yield item, None
+        if final and not self._closed:
+            raise StreamFormatError('Unterminated JSON array')
+
+
+async def iter_json_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[Any, str | None]]:
+    parser = JSONItemsParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.feed(b'', final=True):
+        yield item
+
+
+class RequestStreamingResponse(StreamingResponse):
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # the body iterator consumes the request body itself, so receive() must not be
+        # drained by the disconnect listener of StreamingResponse
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,52 @@
+import html
+import re
+from typing import Iterator
+
+MAX_TEXT_LENGTH = 100_000
+SKIPPED_TAGS = ('script', 'style', 'template', 'noscript', 'head')
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul'
+})
+# every construct also ends at the end of the input, so an unterminated one is consumed once instead of being
+# rescanned from each following '<'; a '<' that starts none of them is text
+MARKUP = re.compile(
+    r'<!--.*?(?:-->|\Z)'
+    rf'|<(?P<skipped>{"|".join(SKIPPED_TAGS)})(?![a-z0-9-])[^>]*(?<!/)>.*?(?:</(?P=skipped)\s*>|\Z)'
+    rf'|<(?P<block>/?(?:{"|".join(sorted(BLOCK_TAGS))}))(?![a-z0-9-])[^>]*(?:>|\Z)'
+    r'|</?[a-z][a-z0-9-]*[^>]*(?:>|\Z)'
+    r'|<[!?][^>]*(?:>|\Z)',
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _replace_markup(markup: re.Match) -> str:
+    return ' ' if markup.lastgroup == 'block' else ''
+
+
+def _scan(value: str, max_length: int) -> Iterator[str]:
+    length = 0
+    position = 0
+    while length < max_length:
+        markup = MARKUP.search(value, position)
+        start = len(value) if markup is None else markup.start()
+        data = value[position:min(start, position + max_length - length)]
+        yield data
+        length += len(data)
+        if markup is None:
+            return
+        if markup.lastgroup == 'block':
+            yield ' '
+        position = markup.end()
+
+
+def html_to_text(value: str | None, max_length: int = MAX_TEXT_LENGTH) -> str:
+    if not value:
+        return ''
+    if len(value) <= max_length:
+        text = MARKUP.sub(_replace_markup, value)
+    else:
+        # the text of a long document can reach max_length well before its end
+        text = ''.join(_scan(value, max_length))
+    return ' '.join(html.unescape(text).split())[:max_length]
@@ -0,0 +1,45 @@
+from typing import Any, Callable, Type
+from sqlalchemy import insert, delete, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from src.core.models import Base as BaseModel
+
+
+class UnitOfWork:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._staged: list[tuple[Executable, list[dict] | None]] = []
+        self._on_commit: list[Callable[[], None]] = []
+
+    async def execute(self, stmt: Executable, params: list[dict] | dict | None = None):
+        return await self.session.execute(stmt, params)
+
+    def add(self, stmt: Executable, params: list[dict] | None = None):
+        self._staged.append((stmt, params))
+
+    def insert_many(self, model: Type[BaseModel], rows: list[dict]):
+        if rows:
+            self.add(insert(model), rows)
+
+    def delete_any(self, model: Type[BaseModel], column: Any, values: list, *criteria):
+        if values:
+            self.add(delete(model).where(
+                column == any_(bindparam(None, list(values), type_=ARRAY(column.type))),
+                *criteria
+            ))
+
+    def on_commit(self, callback: Callable[[], None]):
+        self._on_commit.append(callback)
+
+    def committed(self):
+        callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            callback()
+
+    async def flush(self):
+        staged, self._staged = self._staged, []
+        for stmt, params in staged:
+            await self.session.execute(stmt, params)
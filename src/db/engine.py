@@ -1,14 +1,46 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from src.db.config import config
-from src.core.meta import base_metadata
+from src.db.replicas import ReplicaSet, RoutingSession
 
-engine = create_async_engine(
-    url=config.url(),
-    echo=True
+
+def make_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_POOL_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args={
+            'prepared_statement_cache_size': config.DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': config.DB_STATEMENT_CACHE_SIZE
+        }
+    )
+
+
+engine = make_engine(config.url())
+replicas = ReplicaSet(
+    [make_engine(url) for url in config.DB_REPLICA_URLS],
+    health_interval=config.DB_REPLICA_HEALTH_INTERVAL,
+    max_lag=config.DB_REPLICA_MAX_LAG
 )
 
+session_factory = async_sessionmaker(
+    engine,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replicas=replicas
+)
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    return {
+        'size': pool.size(),
+        'max_overflow': config.DB_POOL_MAX_OVERFLOW,
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(pool.overflow(), 0),
+        'utilisation': round(pool.checkedout() / (pool.size() + config.DB_POOL_MAX_OVERFLOW), 4)
+    }
 
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(base_metadata.drop_all)
-        await conn.run_sync(base_metadata.create_all)
@@ -0,0 +1,49 @@
+import argparse
+import os
+from alembic import command
+from alembic.config import Config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+
+def alembic_config() -> Config:
+    alembic_cfg = Config()
+    alembic_cfg.set_main_option('script_location', MIGRATIONS_DIR)
+    return alembic_cfg
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m src.db.migrate')
+    commands = parser.add_subparsers(dest='command', required=True)
+    upgrade = commands.add_parser('upgrade', help='apply migrations up to a revision')
+    upgrade.add_argument('revision', nargs='?', default='head')
+    upgrade.add_argument('--sql', action='store_true', help='print SQL instead of running it')
+    downgrade = commands.add_parser('downgrade', help='revert migrations down to a revision')
+    downgrade.add_argument('revision')
+    downgrade.add_argument('--sql', action='store_true', help='print SQL instead of running it')
+    stamp = commands.add_parser('stamp', help='mark a revision as applied without running it')
+    stamp.add_argument('revision')
+    revision = commands.add_parser('revision', help='create a new revision file')
+    revision.add_argument('-m', '--message', required=True)
+    revision.add_argument('--autogenerate', action='store_true')
+    commands.add_parser('current', help='show the applied revision')
+    commands.add_parser('history', help='list revisions')
+    args = parser.parse_args(argv)
+
+    alembic_cfg = alembic_config()
+    if args.command == 'upgrade':
+        command.upgrade(alembic_cfg, args.revision, sql=args.sql)
+    elif args.command == 'downgrade':
+        command.downgrade(alembic_cfg, args.revision, sql=args.sql)
+    elif args.command == 'stamp':
+        command.stamp(alembic_cfg, args.revision)
+    elif args.command == 'revision':
+        command.revision(alembic_cfg, message=args.message, autogenerate=args.autogenerate)
+    elif args.command == 'current':
+        command.current(alembic_cfg, verbose=True)
+    else:
+        command.history(alembic_cfg)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import asyncio
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from src.db.config import config
+from src.db.models import Base
+
+target_metadata = Base.metadata
+# indexes the migrations manage on their own, autogenerate must neither drop nor recreate them
+MIGRATION_ONLY_INDEXES = {
+    # created only where pg_trgm is available
+    'ix_recipes_title_trgm',
+    # expression index, reflection does not compare lower(title) COLLATE "C" with the model's
+    'ix_recipes_title_prefix'
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == 'index' and name in MIGRATION_ONLY_INDEXES)
+
+
+def run_migrations_offline():
+    context.configure(
+        url=config.url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        transaction_per_migration=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    # one transaction per revision, so autocommit_block() can step out for CONCURRENTLY
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        transaction_per_migration=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    engine = create_async_engine(config.url(), poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
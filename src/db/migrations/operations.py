@@ -0,0 +1,46 @@
+from typing import Iterator
+from alembic import op
+from sqlalchemy import Row, text
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def create_index_concurrently(name: str, table: str, columns: list, **kwargs):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def drop_index_concurrently(name: str, table: str):
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(table: str, assignments: str, where: str, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    # short autocommitted batches keep row locks brief; `where` must stop matching rows once they are filled
+    stmt = text(
+        f'UPDATE {table} SET {assignments} WHERE id IN ('
+        f'SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT :batch_size FOR UPDATE SKIP LOCKED)'
+    )
+    if op.get_context().as_sql:
+        op.execute(stmt.bindparams(batch_size=batch_size))
+        return 0
+    total = 0
+    with op.get_context().autocommit_block():
+        while True:
+            updated = op.get_bind().execute(stmt, {'batch_size': batch_size}).rowcount
+            if not updated:
+                return total
+            total += updated
+
+
+def batches(table: str, columns: str = 'id', batch_size: int = BACKFILL_BATCH_SIZE) -> Iterator[list[Row]]:
+    # keyset over the primary key, for backfills whose new value cannot be told apart from the old one
+    stmt = text(f'SELECT id, {columns} FROM {table} WHERE id > :last_id ORDER BY id LIMIT :batch_size')
+    last_id = 0
+    while True:
+        rows = op.get_bind().execute(stmt, {'last_id': last_id, 'batch_size': batch_size}).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
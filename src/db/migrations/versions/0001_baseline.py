@@ -0,0 +1,62 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-07-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('email', sa.String(), nullable=False, unique=True),
+        sa.Column('password', sa.String(), nullable=False)
+    )
+    op.create_table(
+        'recipes_categories',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False)
+    )
+    op.create_table(
+        'recipes_ingredients',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(), nullable=False)
+    )
+    op.create_table(
+        'recipes',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('cooking_time', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('searchable_content', sa.String(), nullable=False)
+    )
+    op.create_table(
+        'recipes_categories_values',
+        sa.Column('recipe_id', sa.Integer(), sa.ForeignKey('recipes.id'), primary_key=True),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('recipes_categories.id'), primary_key=True)
+    )
+    op.create_table(
+        'recipes_ingredients_values',
+        sa.Column('recipe_id', sa.Integer(), sa.ForeignKey('recipes.id'), primary_key=True),
+        sa.Column('ingredient_id', sa.Integer(), sa.ForeignKey('recipes_ingredients.id'), primary_key=True)
+    )
+
+
+def downgrade():
+    op.drop_table('recipes_ingredients_values')
+    op.drop_table('recipes_categories_values')
+    op.drop_table('recipes')
+    op.drop_table('recipes_ingredients')
+    op.drop_table('recipes_categories')
+    op.drop_table('users')
@@ -0,0 +1,84 @@
+"""search vector, job outbox and filter indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-07-15 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from src.db.migrations.operations import backfill, create_index_concurrently, drop_index_concurrently
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = '''
+    setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(concat_ws(' ',
+        (SELECT string_agg(c.name, ' ') FROM recipes_categories c
+         JOIN recipes_categories_values v ON v.category_id = c.id WHERE v.recipe_id = recipes.id),
+        (SELECT string_agg(i.name, ' ') FROM recipes_ingredients i
+         JOIN recipes_ingredients_values v ON v.ingredient_id = i.id WHERE v.recipe_id = recipes.id)
+    ), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(regexp_replace(description, '<[^>]*>', ' ', 'g'), '')), 'C')
+'''
+
+
+def upgrade():
+    op.add_column('recipes', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index('ix_jobs_status_run_after', 'jobs', ['status', 'run_after'])
+
+    backfill('recipes', f'search_vector = {SEARCH_VECTOR}', 'search_vector IS NULL')
+    create_index_concurrently('ix_recipes_search_vector', 'recipes', ['search_vector'], postgresql_using='gin')
+    create_index_concurrently('ix_recipes_title_prefix', 'recipes', [sa.text('(lower(title) COLLATE "C")'), 'id'])
+    create_index_concurrently('ix_recipes_cooking_time_id', 'recipes', ['cooking_time', 'id'])
+    create_index_concurrently('ix_recipes_author_id_id', 'recipes', ['author_id', 'id'])
+    create_index_concurrently(
+        'ix_recipes_categories_values_category_recipe', 'recipes_categories_values', ['category_id', 'recipe_id']
+    )
+    create_index_concurrently(
+        'ix_recipes_ingredients_values_ingredient_recipe', 'recipes_ingredients_values', ['ingredient_id', 'recipe_id']
+    )
+
+    # typo-tolerant title suggestions are optional, pg_trgm is not available on every server
+    if op.get_context().as_sql:
+        return
+    with op.get_context().autocommit_block():
+        try:
+            op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except DBAPIError:
+            return
+    create_index_concurrently(
+        'ix_recipes_title_trgm', 'recipes', [sa.text('lower(title) gin_trgm_ops')], postgresql_using='gin'
+    )
+
+
+def downgrade():
+    for name, table in (
+        ('ix_recipes_title_trgm', 'recipes'),
+        ('ix_recipes_ingredients_values_ingredient_recipe', 'recipes_ingredients_values'),
+        ('ix_recipes_categories_values_category_recipe', 'recipes_categories_values'),
+        ('ix_recipes_author_id_id', 'recipes'),
+        ('ix_recipes_cooking_time_id', 'recipes'),
+        ('ix_recipes_title_prefix', 'recipes'),
+        ('ix_recipes_search_vector', 'recipes'),
+    ):
+        drop_index_concurrently(name, table)
+    op.drop_table('jobs')
+    op.drop_column('recipes', 'search_vector')
@@ -0,0 +1,56 @@
+"""extracted description text for the search vector
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-08-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from src.core.text import html_to_text
+from src.db.migrations.operations import batches
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = '''
+    setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(concat_ws(' ',
+        (SELECT string_agg(c.name, ' ') FROM recipes_categories c
+         JOIN recipes_categories_values v ON v.category_id = c.id WHERE v.recipe_id = recipes.id),
+        (SELECT string_agg(i.name, ' ') FROM recipes_ingredients i
+         JOIN recipes_ingredients_values v ON v.ingredient_id = i.id WHERE v.recipe_id = recipes.id)
+    ), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce({description}, '')), 'C')
+'''
+
+
+def update_search_vectors(description: str):
+    stmt = sa.text(f'UPDATE recipes SET search_vector = {SEARCH_VECTOR.format(description=description)}'
+                   ' WHERE id = ANY(:ids)')
+    for rows in batches('recipes'):
+        op.get_bind().execute(stmt, {'ids': [row.id for row in rows]})
+
+
+def upgrade():
+    op.add_column('recipes', sa.Column('description_text', sa.String(), nullable=False, server_default=''))
+    # html_to_text runs here, offline scripts leave it to `python -m src.recipes.search --rebuild-content`
+    if op.get_context().as_sql:
+        return
+    stmt = sa.text('UPDATE recipes SET description_text = :text WHERE id = :id')
+    with op.get_context().autocommit_block():
+        for rows in batches('recipes', 'description'):
+            op.get_bind().execute(stmt, [{'id': row.id, 'text': html_to_text(row.description)} for row in rows])
+        update_search_vectors('description_text')
+
+
+def downgrade():
+    description = "regexp_replace(description, '<[^>]*>', ' ', 'g')"
+    if op.get_context().as_sql:
+        op.execute(f'UPDATE recipes SET search_vector = {SEARCH_VECTOR.format(description=description)}')
+    else:
+        with op.get_context().autocommit_block():
+            update_search_vectors(description)
+    op.drop_column('recipes', 'description_text')
@@ -5,3 +5,4 @@ from src.recipes.categories.values.models import RecipeCategoryValue
 from src.users.models import User
 from src.recipes.ingredients.models import RecipeIngredient
 from src.recipes.ingredients.values.models import RecipeIngredientValue
+from src.jobs.models import Job
@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import CompoundSelect, Select
+from src.core.explain import Explain
+
+logger = logging.getLogger(__name__)
+
+# an idle primary leaves the last replay timestamp old, so a replica that replayed all it received has no lag
+REPLICA_LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class ReplicaSet:
+
+    def __init__(self, engines: list[AsyncEngine], health_interval: float, max_lag: float):
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self._checker: asyncio.Task | None = None
+        self.configure(engines)
+
+    def configure(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self.healthy = [True] * len(engines)
+        self.lag: list[float | None] = [None] * len(engines)
+        self._counter = itertools.count()
+
+    def choose(self) -> AsyncEngine | None:
+        healthy = [engine for engine, ok in zip(self.engines, self.healthy) if ok]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def check(self):
+        for i, engine in enumerate(self.engines):
+            try:
+                async with asyncio.timeout(self.health_interval):
+                    async with engine.connect() as conn:
+                        lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+            except Exception:
+                if self.healthy[i]:
+                    logger.warning('replica %s is unreachable', engine.url.host, exc_info=True)
+                self.healthy[i] = False
+                continue
+            # NULL replay timestamp means the server is not replaying WAL, i.e. it has no lag
+            self.lag[i] = float(lag) if lag is not None else 0.0
+            healthy = self.lag[i] <= self.max_lag
+            if healthy != self.healthy[i]:
+                logger.warning('replica %s is %s, lag %.1fs', engine.url.host, 'healthy' if healthy else 'lagging',
+                               self.lag[i], extra={'replica': engine.url.host, 'lag': self.lag[i]})
+            self.healthy[i] = healthy
+
+    async def _watch(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.health_interval)
+
+    def start(self):
+        if self.engines and (self._checker is None or self._checker.done()):
+            self._checker = asyncio.get_running_loop().create_task(self._watch(), context=contextvars.Context())
+
+    async def stop(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            await asyncio.gather(self._checker, return_exceptions=True)
+            self._checker = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> list[dict]:
+        return [{
+            'host': engine.url.host,
+            'port': engine.url.port,
+            'healthy': healthy,
+            'lag': lag
+        } for engine, healthy, lag in zip(self.engines, self.healthy, self.lag)]
+
+
+def is_read_only(clause) -> bool:
+    if isinstance(clause, Explain):
+        return is_read_only(clause.statement)
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    return isinstance(clause, CompoundSelect)
+
+
+class RoutingSession(Session):
+
+    def __init__(self, *args, replicas: ReplicaSet | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas is not None and not self.info.get('primary') and not self._flushing \
+                and is_read_only(clause):
+            # one replica per session, so a request sees a single consistent snapshot source
+            if 'replica' not in self.info:
+                self.info['replica'] = self.replicas.choose()
+            if self.info['replica'] is not None:
+                return self.info['replica'].sync_engine
+        elif clause is not None and not is_read_only(clause):
+            # everything after a write in this session reads its own writes from the primary
+            self.info['primary'] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
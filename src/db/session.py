@@ -1,2 +1,40 @@
-from src.db.engine import engine
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.engine import session_factory
+
+request_session: ContextVar[AsyncSession | None] = ContextVar('request_session', default=None)
+
+
+@asynccontextmanager
+async def scoped_session() -> AsyncIterator[AsyncSession]:
+    async with session_factory() as session:
+        token = request_session.set(session)
+        try:
+            yield session
+        finally:
+            request_session.reset(token)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with scoped_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def current_session() -> AsyncIterator[AsyncSession]:
+    session = request_session.get()
+    if session is not None:
+        yield session
+        return
+    async with session_factory() as session:
+        yield session
+
+
+@asynccontextmanager
+async def primary_session() -> AsyncIterator[AsyncSession]:
+    # pins the session to the primary for reads that must see writes not yet on the replicas
+    async with current_session() as session:
+        session.info['primary'] = True
+        yield session
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from src.core.explain import Explain
+from src.db.config import config
+from src.db.replicas import is_read_only
+
+logger = logging.getLogger(__name__)
+
+# asyncpg placeholders carry casts: $1::VARCHAR, $2::INTEGER[], $3::TIMESTAMP WITHOUT TIME ZONE
+PARAMETER = re.compile(r'\$\d+(?:::\w+(?: WITH(?:OUT)? TIME ZONE)?(?:\[\])?)?')
+PARAMETER_LIST = re.compile(r'IN \(\?(?:, \?)+\)')
+VALUES_ROWS = re.compile(r'(\([^()]*\))(?:, \1)+')
+WHITESPACE = re.compile(r'\s+')
+QUOTED_LITERAL = re.compile(r"'(?:[^']|'')*'")
+REDACTED_ITEMS = 10
+IGNORE_OPTION = 'slow_query_ignore'
+
+
+def normalise(statement: str) -> str:
+    statement = PARAMETER.sub('?', WHITESPACE.sub(' ', statement).strip())
+    # IN lists and multi-row VALUES vary in length with the input, not with the query shape
+    statement = PARAMETER_LIST.sub('IN (?, ...)', statement)
+    return VALUES_ROWS.sub(r'\1, ...', statement)
+
+
+def redact(value):
+    if value is None or isinstance(value, (bool, int, float, Decimal, date)):
+        return value
+    if isinstance(value, (list, tuple)):
+        items = [redact(item) for item in value[:REDACTED_ITEMS]]
+        return items + ['...'] if len(value) > REDACTED_ITEMS else items
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def scrub_plan(node):
+    # ANALYZE plans the bound values in, conditions read (email)::text = 'alice@example.com'::text
+    if isinstance(node, dict):
+        return {key: scrub_plan(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [scrub_plan(item) for item in node]
+    if isinstance(node, str):
+        return QUOTED_LITERAL.sub("'?'", node)
+    return node
+
+
+class SlowQueryRecorder:
+
+    def __init__(self, enabled: bool, threshold: float, explain_rate: float, explain_timeout: float, size: int):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.explain_timeout = explain_timeout
+        self.entries: deque[dict] = deque(maxlen=size)
+        self.recorded = 0
+        self.explained = 0
+        self.enabled = False
+        self._ids = itertools.count(1)
+        self._explaining: asyncio.Task | None = None
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self.enabled = True
+
+    def disable(self):
+        # no listeners at all while disabled
+        if event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self.enabled = False
+
+    def configure(self, enabled: bool | None = None, threshold: float | None = None,
+                  explain_rate: float | None = None):
+        if threshold is not None:
+            self.threshold = threshold
+        if explain_rate is not None:
+            self.explain_rate = explain_rate
+        if enabled is not None:
+            self.enable() if enabled else self.disable()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['slow_query_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('slow_query_started', None)
+        if started is None or conn.get_execution_options().get(IGNORE_OPTION):
+            return
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(conn.engine, statement, parameters, context, executemany, duration, cursor.rowcount)
+
+    def record(self, engine: Engine, statement: str, parameters, context, executemany: bool, duration: float,
+               rows: int):
+        normalised = normalise(statement)
+        entry = {
+            'id': next(self._ids),
+            'time': datetime.now(timezone.utc),
+            'duration_ms': round(duration * 1000, 3),
+            'fingerprint': hashlib.blake2b(normalised.encode(), digest_size=8).hexdigest(),
+            'statement': normalised,
+            # executemany batches keep the first row as a sample
+            'parameters': redact(parameters[0] if executemany and parameters else parameters),
+            'rows': rows if rows >= 0 else None,
+            'explained': False,
+            'plan': None,
+            'plan_error': None
+        }
+        self.entries.append(entry)
+        self.recorded += 1
+        logger.warning('slow query %.1fms: %.200s', entry['duration_ms'], normalised,
+                       extra={'fingerprint': entry['fingerprint'], 'duration_ms': entry['duration_ms']})
+        if self.explainable(context, executemany) and random.random() < self.explain_rate:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            # ANALYZE runs the query again, so keep at most one such run in flight
+            if self._explaining is None or self._explaining.done():
+                self._explaining = loop.create_task(
+                    self._explain(entry, engine, statement, parameters), context=contextvars.Context()
+                )
+
+    @staticmethod
+    def explainable(context, executemany: bool) -> bool:
+        # ANALYZE executes the statement, only plain reads are safe to repeat
+        compiled = getattr(context, 'compiled', None)
+        if executemany or compiled is None or isinstance(compiled.statement, Explain):
+            return False
+        return is_read_only(compiled.statement)
+
+    async def _explain(self, entry: dict, engine: Engine, statement: str, parameters):
+        try:
+            async with AsyncEngine(engine).connect() as conn:
+                conn = await conn.execution_options(**{IGNORE_OPTION: True})
+                await conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(self.explain_timeout * 1000)}')
+                plan = (await conn.exec_driver_sql(
+                    f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parameters
+                )).scalar()
+                await conn.rollback()
+        except Exception as e:
+            entry['plan_error'] = f'{e.__class__.__name__}: {e}'
+            return
+        entry['plan'] = scrub_plan(plan[0])
+        entry['explained'] = True
+        self.explained += 1
+
+    async def join(self):
+        if self._explaining is not None:
+            await asyncio.gather(self._explaining, return_exceptions=True)
+
+    def clear(self):
+        self.entries.clear()
+
+    def get(self, query_id: int) -> dict | None:
+        return next((entry for entry in self.entries if entry['id'] == query_id), None)
+
+    def recent(self, limit: int, fingerprint: str | None = None) -> list[dict]:
+        entries = (entry for entry in reversed(self.entries) if fingerprint in (None, entry['fingerprint']))
+        return list(itertools.islice(entries, limit))
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold * 1000,
+            'explain_rate': self.explain_rate,
+            'size': len(self.entries),
+            'max_size': self.entries.maxlen,
+            'recorded': self.recorded,
+            'explained': self.explained
+        }
+
+
+slow_queries = SlowQueryRecorder(
+    enabled=config.SLOW_QUERY_ENABLED,
+    threshold=config.SLOW_QUERY_THRESHOLD_MS / 1000,
+    explain_rate=config.SLOW_QUERY_EXPLAIN_RATE,
+    explain_timeout=config.SLOW_QUERY_EXPLAIN_TIMEOUT_MS / 1000,
+    size=config.SLOW_QUERY_BUFFER_SIZE
+)
@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable
+from sqlalchemy import delete, func, insert, select, update
+from src.core.uow import UnitOfWork
+from src.db.config import config
+from src.db.engine import engine
+from src.db.session import current_session, scoped_session
+from src.jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class JobQueue:
+
+    def __init__(self, workers: int, queue_size: int, max_attempts: int, retry_delay: float,
+                 poll_interval: float, lease: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.processed = 0
+        self.retried = 0
+        self.errors = 0
+        self._handlers: dict[str, Handler] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._poller: asyncio.Task | None = None
+
+    def register(self, kind: str, handler: Handler):
+        self._handlers[kind] = handler
+
+    async def enqueue(self, uow: UnitOfWork, kind: str, **payload) -> int:
+        # the outbox row commits together with the write that produced it
+        job_id = (await uow.execute(insert(Job).values(kind=kind, payload=payload).returning(Job.id))).scalar_one()
+        uow.on_commit(lambda: self._push(job_id))
+        return job_id
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(self.queue_size)
+            self._queued = set()
+            self._tasks = []
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            # workers must not inherit the session of the request that started them
+            self._tasks.append(loop.create_task(self._work(), context=contextvars.Context()))
+
+    def _push(self, job_id: int):
+        self._ensure_workers()
+        if job_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            # still durable in the outbox, the poller picks it up later
+            return
+        self._queued.add(job_id)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception('job %s could not be run', job_id, extra={'job_id': job_id})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: int):
+        async with engine.begin() as conn:
+            job = (await conn.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == 'pending')
+                .values(status='running', attempts=Job.attempts + 1, locked_at=func.now())
+                .returning(Job.kind, Job.payload, Job.attempts)
+            )).first()
+        if job is None:
+            return
+        try:
+            handler = self._handlers[job.kind]
+            async with scoped_session() as session:
+                # jobs run right after the write that queued them, replicas may not have it yet
+                session.info['primary'] = True
+                await handler(**job.payload)
+        except Exception as e:
+            await self._fail(job_id, job.attempts, e)
+            return
+        async with engine.begin() as conn:
+            await conn.execute(delete(Job).where(Job.id == job_id))
+        self.processed += 1
+
+    async def _fail(self, job_id: int, attempts: int, error: Exception):
+        values = {'locked_at': None, 'last_error': f'{error.__class__.__name__}: {error}'}
+        extra = {'job_id': job_id, 'attempts': attempts}
+        if attempts >= self.max_attempts:
+            values['status'] = 'failed'
+            self.errors += 1
+            logger.error('job %s failed after %s attempts', job_id, attempts, exc_info=error, extra=extra)
+        else:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            logger.warning('job %s failed, retrying in %ss', job_id, delay, exc_info=error, extra=extra)
+            values.update({'status': 'pending', 'run_after': func.now() + timedelta(seconds=delay)})
+            self._loop.call_later(delay, self._push, job_id)
+            self.retried += 1
+        async with engine.begin() as conn:
+            await conn.execute(update(Job).where(Job.id == job_id).values(values))
+
+    async def recover(self):
+        self._ensure_workers()
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(Job)
+                .where(Job.status == 'running', Job.locked_at < func.now() - timedelta(seconds=self.lease))
+                .values(status='pending', locked_at=None)
+            )
+            ids = (await conn.execute(
+                select(Job.id)
+                .where(Job.status == 'pending', Job.run_after <= func.now())
+                .order_by(Job.id)
+                .limit(max(self.queue_size - self._queue.qsize(), 0))
+            )).scalars().all()
+        for job_id in ids:
+            self._push(job_id)
+
+    async def _poll(self):
+        while True:
+            try:
+                await self.recover()
+            except Exception:
+                logger.exception('job recovery failed')
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._ensure_workers()
+        if self._poller is None or self._poller.done():
+            self._poller = self._loop.create_task(self._poll(), context=contextvars.Context())
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        tasks = self._tasks + ([self._poller] if self._poller else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._poller = None
+
+    async def stats(self):
+        due = (Job.status == 'pending') & (Job.run_after <= func.now())
+        async with current_session() as session:
+            pending, running, failed, lag = (await session.execute(select(
+                func.count().filter(Job.status == 'pending'),
+                func.count().filter(Job.status == 'running'),
+                func.count().filter(Job.status == 'failed'),
+                func.coalesce(func.extract('epoch', func.now() - func.min(Job.run_after).filter(due)), 0)
+            ))).one()
+        return {
+            'workers': len([task for task in self._tasks if not task.done()]),
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'max_queued': self.queue_size,
+            'pending': pending,
+            'running': running,
+            'failed': failed,
+            'lag': float(lag),
+            'processed': self.processed,
+            'retried': self.retried,
+            'errors': self.errors
+        }
+
+
+job_queue = JobQueue(
+    workers=config.JOBS_WORKERS,
+    queue_size=config.JOBS_QUEUE_SIZE,
+    max_attempts=config.JOBS_MAX_ATTEMPTS,
+    retry_delay=config.JOBS_RETRY_DELAY,
+    poll_interval=config.JOBS_POLL_INTERVAL,
+    lease=config.JOBS_LEASE
+)
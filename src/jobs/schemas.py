@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class JobQueueStats(BaseModel):
+    workers: int
+    queued: int
+    max_queued: int
+    pending: int
+    running: int
+    failed: int
+    lag: float
+    processed: int
+    retried: int
+    errors: int
@@ -1,33 +1,213 @@
+import json
+import logging
 import os
-from datetime import datetime
-
-class Logger:
-    DIR_NAME = 'logs'
-    LOG_EXTENSION = '.log'
-    LOG_FILENAME = 'info'
-    today = None
-
-    def __init__(self):
-        self.today = datetime.today().strftime("%d.%m.%Y")
-        self.check_dir()
-
-    def check_dir(self):
-        if not os.path.exists(os.path.join(self.DIR_NAME)):
-            os.mkdir(os.path.join(self.DIR_NAME))
-        if os.path.exists(os.path.join(self.DIR_NAME, self.today)):
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from src.db.config import config
+
+DAY_FORMAT = '%d.%m.%Y'
+# attributes every LogRecord has; anything else came in through `extra`
+RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+STOP = object()
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRS)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class Sampler(logging.Filter):
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.sampled = 0
+
+    def rate(self, record: logging.LogRecord) -> float:
+        event = getattr(record, 'event', None)
+        if event in self.rates:
+            return self.rates[event]
+        name = record.name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # warnings and errors are never sampled out
+        if record.levelno >= logging.WARNING or random.random() < self.rate(record):
+            return True
+        self.sampled += 1
+        return False
+
+
+class LogWriter:
+
+    def __init__(self, directory: str, filename: str, max_bytes: int, backup_count: int,
+                 queue_size: int, batch_size: int, flush_interval: float):
+        self.directory = directory
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(queue_size)
+        self.written = 0
+        self.errors = 0
+        self._day: str | None = None
+        self._file = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def path(self, index: int = 0) -> str:
+        suffix = f'.{index}' if index else ''
+        return os.path.join(self.directory, self._day, f'{self.filename}{suffix}.log')
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(STOP)
+            self._thread.join()
+        self._thread = None
+        # whatever was logged after the thread went away
+        while batch := self._take(block=False):
+            self._write([line for line in batch if line is not STOP])
+        with self._lock:
+            self._close()
+
+    def _take(self, block: bool = True) -> list:
+        batch = []
+        try:
+            batch.append(self.queue.get() if block else self.queue.get_nowait())
+            # the first line waits at most flush_interval for the rest of its batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                batch.append(self.queue.get(timeout=timeout) if block and timeout > 0 else self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            lines = [line for line in batch if line is not STOP]
+            self._write(lines)
+            if len(lines) != len(batch):
+                return
+
+    def _write(self, lines: list[str]):
+        if not lines:
             return
-        os.mkdir(os.path.join(self.DIR_NAME, self.today))
-        return
-
-    def check_file(self):
-        f = open(os.path.join(self.DIR_NAME, self.today, self.LOG_FILENAME + self.LOG_EXTENSION), 'w')
-        f.close()
-
-    def add(self, data: str):
-        #self.check_file()
-        with open(os.path.join(self.DIR_NAME, self.today, self.LOG_FILENAME + self.LOG_EXTENSION), "a") as f:
-            f.write(data)
-            f.write('\n')
-            f.write('==========')
-            f.write('\n')
-        return
+        data = ''.join(line + '\n' for line in lines).encode()
+        with self._lock:
+            try:
+                self._open(len(data))
+                self._file.write(data)
+                self._file.flush()
+                self.written += len(lines)
+            except Exception:
+                self.errors += 1
+                self._close()
+
+    def _open(self, size: int):
+        day = datetime.now().strftime(DAY_FORMAT)
+        if day != self._day:
+            self._close()
+            self._day = day
+        elif self._file is not None and self._file.tell() and self._file.tell() + size > self.max_bytes:
+            self._close()
+            self._rotate()
+        if self._file is None:
+            os.makedirs(os.path.join(self.directory, self._day), exist_ok=True)
+            self._file = open(self.path(), 'ab')
+
+    def _rotate(self):
+        # info.log -> info.1.log -> ... -> info.<backup_count>.log, the oldest one is dropped
+        for index in range(self.backup_count, 0, -1):
+            source = self.path(index - 1)
+            if os.path.exists(source):
+                os.replace(source, self.path(index))
+        if not self.backup_count:
+            os.remove(self.path())
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BufferedJsonHandler(QueueHandler):
+
+    def __init__(self, writer: LogWriter, sample_rates: dict[str, float]):
+        super().__init__(writer.queue)
+        self.writer = writer
+        self.sampler = Sampler(sample_rates)
+        self.dropped = 0
+        self.setFormatter(JsonFormatter())
+        self.addFilter(self.sampler)
+
+    def prepare(self, record: logging.LogRecord) -> str:
+        # formatted on the calling thread, so the writer never touches the caller's objects
+        return self.format(record)
+
+    def enqueue(self, line: str):
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            # a slow disk must not stall the event loop
+            self.dropped += 1
+
+    def close(self):
+        self.writer.stop()
+        super().close()
+
+    def stats(self) -> dict:
+        return {
+            'queued': self.queue.qsize(),
+            'max_queued': self.queue.maxsize,
+            'written': self.writer.written,
+            'dropped': self.dropped,
+            'sampled': self.sampler.sampled,
+            'errors': self.writer.errors
+        }
+
+
+log_writer = LogWriter(
+    directory=config.LOG_DIR,
+    filename=config.LOG_FILENAME,
+    max_bytes=config.LOG_MAX_BYTES,
+    backup_count=config.LOG_BACKUP_COUNT,
+    queue_size=config.LOG_QUEUE_SIZE,
+    batch_size=config.LOG_BATCH_SIZE,
+    flush_interval=config.LOG_FLUSH_INTERVAL
+)
+log_handler = BufferedJsonHandler(log_writer, sample_rates=config.LOG_SAMPLE_RATES)
+
+
+def configure_logging():
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL)
+    if log_handler not in root.handlers:
+        root.addHandler(log_handler)
+    # INFO logs every statement, DEBUG adds result rows; this replaces create_engine(echo=True)
+    logging.getLogger('sqlalchemy.engine').setLevel(config.LOG_SQL_LEVEL)
@@ -1,16 +1,48 @@
 import uvicorn
-from fastapi import FastAPI, APIRouter
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends
 from src.users.router import router as user_router
 from src.recipes.router import router as recipe_router
+from src.monitoring.router import router as monitoring_router
+from src.monitoring.metrics import TimingMiddleware, request_metrics
+from src.monitoring.service import monitoring_service
+from src.core.timing import instrument_queries
+from src.db.config import config
+from src.db.engine import engine, replicas
+from src.db.session import get_session
+from src.users.passwords import password_hasher
+from src.jobs.queue import job_queue
+from src.logger import configure_logging, log_writer
 from src.db.models import *
 
-app = FastAPI()
-router = APIRouter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()
+    replicas.start()
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    password_hasher.shutdown()
+    await replicas.stop()
+    await engine.dispose()
+    log_writer.stop()
+
+
+configure_logging()
+app = FastAPI(lifespan=lifespan)
+router = APIRouter(dependencies=[Depends(get_session)])
 router.include_router(user_router, prefix='/users', tags=['Users'])
 router.include_router(recipe_router, prefix='/recipes', tags=['Recipes'])
+router.include_router(monitoring_router, prefix='/monitoring', tags=['Monitoring'])
+router.add_api_route('/metrics', monitoring_service.metrics, methods={'get'}, include_in_schema=False)
 router.add_api_route('/', lambda: sorted({route.path for route in vars(router)['routes']}))
 app.include_router(router)
 
+if config.METRICS_ENABLED:
+    instrument_queries()
+    app.add_middleware(TimingMiddleware, metrics=request_metrics, server_timing=config.SERVER_TIMING_ENABLED)
+
 
 if __name__ == '__main__':
     uvicorn.run(app,
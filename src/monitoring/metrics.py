@@ -0,0 +1,139 @@
+from bisect import bisect_left
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.core.timing import RequestTimings, request_timings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Prometheus buckets are upper-inclusive, the last slot is +Inf
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: dict) -> list[str]:
+        lines = []
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            lines.append(sample(f'{name}_bucket', {**labels, 'le': bound}, total))
+        lines.append(sample(f'{name}_sum', labels, self.sum))
+        lines.append(sample(f'{name}_count', labels, self.count))
+        return lines
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def sample(name: str, labels: dict, value) -> str:
+    if not labels:
+        return f'{name} {value}'
+    rendered = ','.join(f'{key}="{escape(label)}"' for key, label in labels.items())
+    return f'{name}{{{rendered}}} {value}'
+
+
+class RequestMetrics:
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.queries: dict[tuple[str, str], int] = {}
+        self.spans: dict[tuple[str, str, str], float] = {}
+
+    def observe(self, method: str, route: str, status: int, timings: RequestTimings):
+        key = (method, route)
+        self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+        if key not in self.latency:
+            self.latency[key] = Histogram(self.buckets)
+            self.db_time[key] = Histogram(self.buckets)
+        self.latency[key].observe(timings.elapsed())
+        self.db_time[key].observe(timings.db)
+        self.queries[key] = self.queries.get(key, 0) + timings.queries
+        for name, duration in timings.spans.items():
+            self.spans[(method, route, name)] = self.spans.get((method, route, name), 0.0) + duration
+
+    def render(self) -> str:
+        lines = [
+            '# HELP http_requests_total Requests by route and status.',
+            '# TYPE http_requests_total counter'
+        ]
+        for (method, route, status), count in self.requests.items():
+            lines.append(sample('http_requests_total', {'method': method, 'route': route, 'status': status}, count))
+        for name, histograms, description in (
+            ('http_request_duration_seconds', self.latency, 'Time until the response headers were sent.'),
+            ('http_request_db_duration_seconds', self.db_time, 'Time spent executing SQL per request.')
+        ):
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+            for (method, route), histogram in histograms.items():
+                lines += histogram.samples(name, {'method': method, 'route': route})
+        lines += [
+            '# HELP http_request_db_queries_total SQL statements executed while serving requests.',
+            '# TYPE http_request_db_queries_total counter'
+        ]
+        for (method, route), count in self.queries.items():
+            lines.append(sample('http_request_db_queries_total', {'method': method, 'route': route}, count))
+        lines += [
+            '# HELP http_request_span_seconds_total Time spent in named request phases (auth, serialize).',
+            '# TYPE http_request_span_seconds_total counter'
+        ]
+        for (method, route, span), duration in self.spans.items():
+            lines.append(sample(
+                'http_request_span_seconds_total', {'method': method, 'route': route, 'span': span}, duration
+            ))
+        return '\n'.join(lines) + '\n'
+
+
+class TimingMiddleware:
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics, server_timing: bool = True):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status = 500
+        observed = False
+
+        async def send_with_timing(message: Message):
+            nonlocal status, observed
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.server_timing:
+                    MutableHeaders(scope=message).append('Server-Timing', timings.server_timing())
+                # streamed bodies are not part of the latency, the route is known once headers go out
+                self.observe(scope, status, timings)
+                observed = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            if not observed:
+                self.observe(scope, status, timings)
+
+    def observe(self, scope: Scope, status: int, timings: RequestTimings):
+        # the route template keeps label cardinality bounded, raw paths carry ids
+        route = scope.get('route')
+        self.metrics.observe(scope['method'], getattr(route, 'path', UNMATCHED_ROUTE), status, timings)
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,61 @@
+from fastapi import APIRouter
+from src.monitoring.service import monitoring_service
+from src.monitoring.schemas import PoolStats, CacheStats, LogStats, ReplicaStats, SlowQuery, SlowQueryLog, SlowQueryStats
+from src.jobs.schemas import JobQueueStats
+
+router = APIRouter()
+
+router.add_api_route(
+    '/pool',
+    monitoring_service.pool,
+    methods={'get'},
+    response_model=PoolStats
+)
+router.add_api_route(
+    '/replicas',
+    monitoring_service.replicas,
+    methods={'get'},
+    response_model=list[ReplicaStats]
+)
+router.add_api_route(
+    '/caches',
+    monitoring_service.caches,
+    methods={'get'},
+    response_model=dict[str, CacheStats]
+)
+router.add_api_route(
+    '/jobs',
+    monitoring_service.jobs,
+    methods={'get'},
+    response_model=JobQueueStats
+)
+router.add_api_route(
+    '/logging',
+    monitoring_service.logging,
+    methods={'get'},
+    response_model=LogStats
+)
+router.add_api_route(
+    '/slow-queries',
+    monitoring_service.slow_queries,
+    methods={'get'},
+    response_model=SlowQueryLog
+)
+router.add_api_route(
+    '/slow-queries',
+    monitoring_service.configure_slow_queries,
+    methods={'patch'},
+    response_model=SlowQueryStats
+)
+router.add_api_route(
+    '/slow-queries',
+    monitoring_service.clear_slow_queries,
+    methods={'delete'},
+    response_model=SlowQueryStats
+)
+router.add_api_route(
+    '/slow-queries/{query_id}',
+    monitoring_service.slow_query,
+    methods={'get'},
+    response_model=SlowQuery
+)
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Any
+from pydantic import BaseModel, Field
+
+
+class PoolStats(BaseModel):
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    utilisation: float
+
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class LogStats(BaseModel):
+    queued: int
+    max_queued: int
+    written: int
+    dropped: int
+    sampled: int
+    errors: int
+
+
+class ReplicaStats(BaseModel):
+    host: str | None = None
+    port: int | None = None
+    healthy: bool
+    lag: float | None = None
+
+
+class SlowQuerySummary(BaseModel):
+    id: int
+    time: datetime
+    duration_ms: float
+    fingerprint: str
+    statement: str
+    parameters: Any = None
+    rows: int | None = None
+    explained: bool
+    plan_error: str | None = None
+
+
+class SlowQuery(SlowQuerySummary):
+    plan: dict | None = None
+
+
+class SlowQueryStats(BaseModel):
+    enabled: bool
+    threshold_ms: float
+    explain_rate: float
+    size: int
+    max_size: int
+    recorded: int
+    explained: int
+
+
+class SlowQueryLog(SlowQueryStats):
+    items: list[SlowQuerySummary]
+
+
+class SlowQuerySettings(BaseModel):
+    enabled: bool | None = None
+    threshold_ms: float | None = Field(None, ge=0)
+    explain_rate: float | None = Field(None, ge=0, le=1)
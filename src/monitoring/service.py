@@ -0,0 +1,72 @@
+from fastapi import Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from src.core.cache import response_cache
+from src.db.engine import pool_stats, replicas
+from src.db.slow_queries import slow_queries
+from src.jobs.queue import job_queue
+from src.logger import log_handler
+from src.monitoring.metrics import request_metrics
+from src.monitoring.schemas import SlowQuerySettings
+from src.users.cache import principal_cache
+from src.users.service import user_service, oauth2_scheme
+from src.recipes.references import categories_cache, ingredients_cache
+
+
+class MonitoringService:
+
+    async def pool(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return pool_stats()
+
+    async def caches(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return {
+            'principals': principal_cache.stats(),
+            'categories': categories_cache.stats(),
+            'ingredients': ingredients_cache.stats(),
+            'responses': response_cache.stats()
+        }
+
+    async def replicas(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return replicas.stats()
+
+    async def jobs(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return await job_queue.stats()
+
+    async def logging(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return log_handler.stats()
+
+    async def metrics(self):
+        return PlainTextResponse(request_metrics.render(), media_type='text/plain; version=0.0.4')
+
+    async def slow_queries(self, limit: int = Query(50, ge=1, le=1000), fingerprint: str | None = None,
+                           token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        return {**slow_queries.stats(), 'items': slow_queries.recent(limit, fingerprint)}
+
+    async def slow_query(self, query_id: int, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        entry = slow_queries.get(query_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail='Slow query not found')
+        return entry
+
+    async def configure_slow_queries(self, data: SlowQuerySettings, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        slow_queries.configure(
+            enabled=data.enabled,
+            threshold=data.threshold_ms / 1000 if data.threshold_ms is not None else None,
+            explain_rate=data.explain_rate
+        )
+        return slow_queries.stats()
+
+    async def clear_slow_queries(self, token: str = Depends(oauth2_scheme)):
+        await user_service.get_admin(token=token)
+        slow_queries.clear()
+        return slow_queries.stats()
+
+
+monitoring_service = MonitoringService()
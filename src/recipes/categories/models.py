@@ -10,5 +10,5 @@ class RecipeCategory(Base):
     recipes: Mapped[list['Recipe']] = relationship(
         back_populates='categories',
         secondary='recipes_categories_values',
-        lazy='selectin'
+        lazy='raise'
     )
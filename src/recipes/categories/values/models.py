@@ -1,10 +1,13 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from src.core.models import Base
 
 
 class RecipeCategoryValue(Base):
     __tablename__ = 'recipes_categories_values'
+    __table_args__ = (
+        Index('ix_recipes_categories_values_category_recipe', 'category_id', 'recipe_id'),
+    )
 
     recipe_id: Mapped[int] = mapped_column(ForeignKey('recipes.id'), primary_key=True)
     category_id: Mapped[int] = mapped_column(ForeignKey('recipes_categories.id'), primary_key=True)
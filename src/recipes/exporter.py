@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from sqlalchemy import func, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql import Select
+from typing import AsyncIterator
+from src.db.session import scoped_session
+from src.recipes.models import Recipe
+from src.recipes.categories.models import RecipeCategory
+from src.recipes.ingredients.models import RecipeIngredient
+from src.recipes.categories.values.models import RecipeCategoryValue
+from src.recipes.ingredients.values.models import RecipeIngredientValue
+
+EXPORT_BATCH_SIZE = 1000
+CSV_COLUMNS = ('id', 'title', 'description', 'cooking_time', 'author_id',
+               'category_ids', 'categories', 'ingredient_ids', 'ingredients')
+CSV_LIST_SEPARATOR = '|'
+
+
+def linked(model, value_model, join_on, name: str):
+    # one pass over the links per recipe yields both arrays, in the same order
+    return (
+        select(
+            func.array_agg(aggregate_order_by(model.id, model.id)).label('ids'),
+            func.array_agg(aggregate_order_by(model.name, model.id)).label('names')
+        )
+        .select_from(value_model)
+        .join(model, join_on)
+        .where(value_model.recipe_id == Recipe.id)
+        .lateral(name)
+    )
+
+
+class RecipeExporter:
+
+    def __init__(self, stmt: Select, batch_size: int = EXPORT_BATCH_SIZE):
+        self.stmt = stmt
+        self.batch_size = batch_size
+
+    @staticmethod
+    def statement() -> Select:
+        categories = linked(
+            RecipeCategory, RecipeCategoryValue, RecipeCategory.id == RecipeCategoryValue.category_id, 'categories'
+        )
+        ingredients = linked(
+            RecipeIngredient, RecipeIngredientValue, RecipeIngredient.id == RecipeIngredientValue.ingredient_id,
+            'ingredients'
+        )
+        # an aggregate without GROUP BY always returns a row, the lateral joins never drop a recipe
+        return (
+            select(
+                Recipe.id,
+                Recipe.title,
+                Recipe.description,
+                Recipe.cooking_time,
+                Recipe.author_id,
+                categories.c.ids.label('category_ids'),
+                categories.c.names.label('category_names'),
+                ingredients.c.ids.label('ingredient_ids'),
+                ingredients.c.names.label('ingredient_names'),
+            )
+            .select_from(Recipe)
+            .join(categories, true())
+            .join(ingredients, true())
+            .order_by(Recipe.id)
+        )
+
+    async def rows(self) -> AsyncIterator[list]:
+        async with scoped_session() as session:
+            result = await session.stream(self.stmt.execution_options(yield_per=self.batch_size))
+            async for partition in result.partitions():
+                yield partition
+
+    async def ndjson(self) -> AsyncIterator[bytes]:
+        async for partition in self.rows():
+            yield b''.join(json.dumps({
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'cooking_time': row.cooking_time,
+                'author_id': row.author_id,
+                'categories': [{'id': i, 'name': name} for i, name in zip(row.category_ids or [], row.category_names or [])],
+                'ingredients': [{'id': i, 'name': name} for i, name in zip(row.ingredient_ids or [], row.ingredient_names or [])]
+            }, ensure_ascii=False).encode() + b'\n' for row in partition)
+
+    async def csv(self) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        async for partition in self.rows():
+            for row in partition:
+                writer.writerow((
+                    row.id,
+                    row.title,
+                    row.description,
+                    row.cooking_time,
+                    row.author_id,
+                    CSV_LIST_SEPARATOR.join(map(str, row.category_ids or [])),
+                    CSV_LIST_SEPARATOR.join(row.category_names or []),
+                    CSV_LIST_SEPARATOR.join(map(str, row.ingredient_ids or [])),
+                    CSV_LIST_SEPARATOR.join(row.ingredient_names or []),
+                ))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
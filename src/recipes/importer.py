@@ -0,0 +1,140 @@
+import json
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+from src.core.service import BaseService
+from src.core.streaming import StreamFormatError, iter_json_items
+from src.db.session import scoped_session
+from src.recipes.matching import ingredient_index
+from src.recipes.models import Recipe
+from src.recipes.references import categories_cache, ingredients_cache
+from src.recipes.schemas import RecipeCreateRequest
+from src.jobs.queue import job_queue
+from src.recipes.search import INDEX_RECIPES_JOB
+from src.recipes.categories.values.models import RecipeCategoryValue
+from src.recipes.ingredients.values.models import RecipeIngredientValue
+
+IMPORT_BATCH_SIZE = 500
+INTEGER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+def ndjson(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode() + b'\n'
+
+
+class RecipeImporter(BaseService):
+
+    def __init__(self, author_id: int, batch_size: int = IMPORT_BATCH_SIZE):
+        self.author_id = author_id
+        self.batch_size = batch_size
+        self.imported = 0
+        self.failed = 0
+
+    async def prepare(self, item) -> tuple[dict | None, str | None]:
+        try:
+            data = RecipeCreateRequest.model_validate(item)
+        except ValidationError as e:
+            return None, '; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+        # what the schema accepts but Postgres would not, caught here so it does not reach the batch
+        if not INTEGER_RANGE[0] <= data.cooking_time <= INTEGER_RANGE[1]:
+            return None, 'cooking_time: Value is out of range'
+        if '\x00' in data.title or '\x00' in data.description:
+            return None, 'NUL characters are not allowed'
+        categories = list(dict.fromkeys(data.categories))
+        ingredients = list(dict.fromkeys(data.ingredients))
+        known_categories = await categories_cache.rows()
+        known_ingredients = await ingredients_cache.rows()
+        unknown_categories = [i for i in categories if i not in known_categories]
+        unknown_ingredients = [i for i in ingredients if i not in known_ingredients]
+        if unknown_categories:
+            return None, f'Unknown categories: {unknown_categories}'
+        if unknown_ingredients:
+            return None, f'Unknown ingredients: {unknown_ingredients}'
+        return {
+            'values': {
+                'title': data.title,
+                'description': data.description,
+                'cooking_time': data.cooking_time,
+                'author_id': self.author_id,
+                'searchable_content': ''
+            },
+            'categories': categories,
+            'ingredients': ingredients
+        }, None
+
+    @staticmethod
+    async def insert(session: AsyncSession, batch: list[tuple[int, dict]]) -> list[int]:
+        async with session.begin_nested():
+            ids = (await session.execute(
+                insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True),
+                [item['values'] for _, item in batch]
+            )).scalars().all()
+            for model, links in (
+                (RecipeCategoryValue, [
+                    {'recipe_id': recipe_id, 'category_id': i}
+                    for recipe_id, (_, item) in zip(ids, batch) for i in item['categories']
+                ]),
+                (RecipeIngredientValue, [
+                    {'recipe_id': recipe_id, 'ingredient_id': i}
+                    for recipe_id, (_, item) in zip(ids, batch) for i in item['ingredients']
+                ])
+            ):
+                if links:
+                    await session.execute(insert(model), links)
+        return ids
+
+    async def flush(self, batch: list[tuple[int, dict]]) -> list[dict]:
+        if not batch:
+            return []
+        inserted, rejected = [], []
+        try:
+            async with self.unit_of_work() as uow:
+                try:
+                    inserted = list(zip(await self.insert(uow.session, batch), batch))
+                except DBAPIError:
+                    # only the rows the database rejects are lost, each retried row has its own savepoint
+                    for row in batch:
+                        try:
+                            [recipe_id] = await self.insert(uow.session, [row])
+                        except DBAPIError as e:
+                            rejected.append({'index': row[0], 'error': f'Rejected: {e.__class__.__name__}'})
+                        else:
+                            inserted.append((recipe_id, row))
+                if inserted:
+                    await job_queue.enqueue(uow, INDEX_RECIPES_JOB, recipe_ids=[recipe_id for recipe_id, _ in inserted])
+                uow.on_commit(lambda: [
+                    ingredient_index.put(recipe_id, item['ingredients']) for recipe_id, (_, item) in inserted
+                ])
+        except Exception as e:
+            self.failed += len(batch)
+            return [{'index': index, 'error': f'Batch failed: {e.__class__.__name__}'} for index, _ in batch]
+        self.imported += len(inserted)
+        self.failed += len(rejected)
+        results = [{'index': index, 'id': recipe_id} for recipe_id, (index, _) in inserted] + rejected
+        return sorted(results, key=lambda result: result['index'])
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        batch = []
+        index = 0
+        async with scoped_session():
+            try:
+                async for item, error in iter_json_items(chunks):
+                    if error is None:
+                        item, error = await self.prepare(item)
+                    if error is not None:
+                        self.failed += 1
+                        yield ndjson({'index': index, 'error': error})
+                    else:
+                        batch.append((index, item))
+                    index += 1
+                    if len(batch) >= self.batch_size:
+                        for result in await self.flush(batch):
+                            yield ndjson(result)
+                        batch = []
+            except StreamFormatError as e:
+                yield ndjson({'index': index, 'error': str(e)})
+            for result in await self.flush(batch):
+                yield ndjson(result)
+        yield ndjson({'imported': self.imported, 'failed': self.failed})
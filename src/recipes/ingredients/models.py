@@ -9,5 +9,5 @@ class RecipeIngredient(Base):
     recipes: Mapped[list['Recipe']] = relationship(
         back_populates='ingredients',
         secondary='recipes_ingredients_values',
-        lazy='selectin'
+        lazy='raise'
     )
@@ -1,10 +1,13 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from src.core.models import Base
 
 
 class RecipeIngredientValue(Base):
     __tablename__ = 'recipes_ingredients_values'
+    __table_args__ = (
+        Index('ix_recipes_ingredients_values_ingredient_recipe', 'ingredient_id', 'recipe_id'),
+    )
 
     recipe_id: Mapped[int] = mapped_column(ForeignKey('recipes.id'), primary_key=True, nullable=False)
     ingredient_id: Mapped[int] = mapped_column(ForeignKey('recipes_ingredients.id'), primary_key=True, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+from src.db.models import Recipe, RecipeCategory, RecipeIngredient, User
+
+RECIPE_COLUMNS = (Recipe.id, Recipe.title, Recipe.description, Recipe.cooking_time, Recipe.author_id)
+
+RECIPE_RELATIONS = (
+    joinedload(Recipe.author).load_only(User.id, User.email, raiseload=True),
+    selectinload(Recipe.categories).load_only(
+        RecipeCategory.id, RecipeCategory.name, RecipeCategory.parent_id, raiseload=True
+    ),
+    selectinload(Recipe.ingredients).load_only(RecipeIngredient.id, RecipeIngredient.name, raiseload=True),
+    raiseload('*'),
+)
+
+RECIPE_DETAIL = (load_only(*RECIPE_COLUMNS, raiseload=True), *RECIPE_RELATIONS)
@@ -0,0 +1,95 @@
+import asyncio
+import heapq
+import time
+from collections import Counter
+from sqlalchemy import select
+from src.db.config import config
+from src.db.session import current_session
+from src.recipes.ingredients.values.models import RecipeIngredientValue
+
+MATCH_LIMIT = 20
+
+
+class IngredientIndex:
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._postings: dict[int, set[int]] = {}
+        self._recipes: dict[int, frozenset[int]] = {}
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._loaded_version == self.version and time.monotonic() - self._loaded_at < self.ttl
+
+    async def load(self):
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                return
+            # a write that lands while loading bumps the version and forces another reload
+            version = self.version
+            recipes: dict[int, set[int]] = {}
+            async with current_session() as session:
+                result = await session.stream(
+                    select(RecipeIngredientValue.recipe_id, RecipeIngredientValue.ingredient_id)
+                    .execution_options(yield_per=10000)
+                )
+                async for partition in result.partitions():
+                    for recipe_id, ingredient_id in partition:
+                        recipes.setdefault(recipe_id, set()).add(ingredient_id)
+            self._recipes = {}
+            self._postings = {}
+            for recipe_id, ingredients in recipes.items():
+                self._link(recipe_id, ingredients)
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+
+    def _link(self, recipe_id: int, ingredients):
+        self._recipes[recipe_id] = frozenset(ingredients)
+        for ingredient_id in ingredients:
+            self._postings.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def _unlink(self, recipe_id: int):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            postings = self._postings.get(ingredient_id)
+            if postings is not None:
+                postings.discard(recipe_id)
+                if not postings:
+                    del self._postings[ingredient_id]
+
+    def put(self, recipe_id: int, ingredients):
+        if self._lock.locked():
+            self.version += 1
+        self._unlink(recipe_id)
+        if ingredients:
+            self._link(recipe_id, ingredients)
+
+    def remove(self, recipe_id: int):
+        if self._lock.locked():
+            self.version += 1
+        self._unlink(recipe_id)
+
+    async def match(self, ingredients: list[int], limit: int = MATCH_LIMIT,
+                    max_missing: int | None = None) -> list[tuple[int, int, frozenset[int]]]:
+        await self.load()
+        available = set(ingredients)
+        matched = Counter()
+        for ingredient_id in available:
+            matched.update(self._postings.get(ingredient_id, ()))
+        candidates = (
+            (len(self._recipes[recipe_id]) - count, -count, recipe_id)
+            for recipe_id, count in matched.items()
+        )
+        if max_missing is not None:
+            candidates = (candidate for candidate in candidates if candidate[0] <= max_missing)
+        return [
+            (recipe_id, -count, self._recipes[recipe_id] - available)
+            for _, count, recipe_id in heapq.nsmallest(limit, candidates)
+        ]
+
+
+ingredient_index = IngredientIndex(ttl=config.MATCH_INDEX_TTL)
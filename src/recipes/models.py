@@ -1,25 +1,37 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.core.models import Base
 
 
 class Recipe(Base):
     __tablename__ = 'recipes'
+    __table_args__ = (
+        Index('ix_recipes_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_recipes_cooking_time_id', 'cooking_time', 'id'),
+        Index('ix_recipes_author_id_id', 'author_id', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(nullable=False)
     description: Mapped[str] = mapped_column(nullable=False)
     cooking_time: Mapped[int] = mapped_column(nullable=False)
     author_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
-    author: Mapped['User'] = relationship(back_populates='recipes', lazy='selectin')
+    author: Mapped['User'] = relationship(back_populates='recipes', lazy='raise')
     categories: Mapped[list['RecipeCategory']] = relationship(
         back_populates='recipes',
         secondary='recipes_categories_values',
-        lazy='selectin'
+        lazy='raise'
     )
     ingredients: Mapped[list['RecipeIngredient']] = relationship(
         back_populates='recipes',
         secondary='recipes_ingredients_values',
-        lazy='selectin'
+        lazy='raise'
     )
     searchable_content: Mapped[str] = mapped_column(nullable=False)
+    # html_to_text of the description, filled in by the indexing job
+    description_text: Mapped[str] = mapped_column(nullable=False, server_default='', deferred=True)
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
+
+Index('ix_recipes_title_prefix', func.lower(Recipe.title).collate('C'), Recipe.id)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from fastapi import HTTPException
+from sqlalchemy import select
+from typing import Type
+from src.core.hooks import on_write
+from src.core.models import Base as BaseModel
+from src.db.config import config
+from src.db.session import current_session
+from src.recipes.categories.models import RecipeCategory
+from src.recipes.ingredients.models import RecipeIngredient
+
+
+class ReferenceCache:
+
+    def __init__(self, model: Type[BaseModel], columns: tuple[str, ...], label: str, ttl: float):
+        self.model = model
+        self.columns = columns
+        self.label = label
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._rows: dict[int, dict] = {}
+        self._lock = asyncio.Lock()
+        on_write(model, self.invalidate)
+
+    def invalidate(self):
+        self.version += 1
+
+    def is_fresh(self) -> bool:
+        return self._loaded_version == self.version and time.monotonic() - self._loaded_at < self.ttl
+
+    async def rows(self) -> dict[int, dict]:
+        if self.is_fresh():
+            self.hits += 1
+            return self._rows
+        async with self._lock:
+            if not self.is_fresh():
+                self.misses += 1
+                version = self.version
+                stmt = select(*(getattr(self.model, column) for column in self.columns)).order_by(self.model.id)
+                async with current_session() as session:
+                    result = await session.execute(stmt)
+                    self._rows = {row.id: dict(row._mapping) for row in result}
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+        return self._rows
+
+    async def names(self, ids: list[int]) -> dict[int, str]:
+        rows = await self.rows()
+        return {i: rows[i]['name'] for i in ids if i in rows}
+
+    async def validate(self, ids: list[int]):
+        rows = await self.rows()
+        unknown = [i for i in ids if i not in rows]
+        if unknown:
+            raise HTTPException(status_code=422, detail=f'Unknown {self.label}: {unknown}')
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._rows),
+            'max_size': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': 0
+        }
+
+
+categories_cache = ReferenceCache(
+    RecipeCategory, ('id', 'name', 'parent_id'), label='categories', ttl=config.REFERENCE_CACHE_TTL
+)
+ingredients_cache = ReferenceCache(
+    RecipeIngredient, ('id', 'name'), label='ingredients', ttl=config.REFERENCE_CACHE_TTL
+)
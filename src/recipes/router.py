@@ -1,6 +1,13 @@
 from fastapi import APIRouter
-from src.recipes.service import recipes_service
-from src.recipes.schemas import RecipeCreateResponse, RecipeResponse, RecipeDeleteResponse, RecipeListResponse
+from fastapi.responses import StreamingResponse
+from src.core.cache import response_cache
+from src.core.streaming import RequestStreamingResponse
+from src.recipes.service import recipes_service, recipe_tag, RECIPES_LIST_TAG
+from src.recipes.schemas import (
+    RecipeCreateResponse, RecipeResponse, RecipeDeleteResponse, RecipeListResponse, SuggestResponse, RecipeMatchResponse
+)
+from src.recipes.categories.schemas import RecipeCategory
+from src.recipes.ingredients.schemas import RecipeIngredient
 
 router = APIRouter()
 
@@ -10,21 +17,77 @@ router.add_api_route(
     methods={'post'},
     response_model=RecipeCreateResponse
 )
+router.add_api_route(
+    '/import',
+    recipes_service.import_recipes,
+    methods={'post'},
+    response_class=RequestStreamingResponse
+)
+router.add_api_route(
+    '/export',
+    recipes_service.export,
+    methods={'get'},
+    response_class=StreamingResponse
+)
 router.add_api_route(
     '/list',
-    recipes_service.list,
+    response_cache.cached(
+        recipes_service.list,
+        RecipeListResponse,
+        namespace='recipes:list',
+        tags=lambda params: [RECIPES_LIST_TAG]
+    ),
     methods={'get'},
     response_model=RecipeListResponse
 )
 router.add_api_route(
     '/list/filter',
-    recipes_service.filter,
+    response_cache.cached(
+        recipes_service.filter,
+        RecipeListResponse,
+        namespace='recipes:filter',
+        tags=lambda params: [RECIPES_LIST_TAG]
+    ),
     methods={'get'},
     response_model=RecipeListResponse
 )
+router.add_api_route(
+    '/match',
+    recipes_service.match,
+    methods={'get'},
+    response_model=RecipeMatchResponse
+)
+router.add_api_route(
+    '/suggest',
+    response_cache.cached(
+        recipes_service.suggest,
+        SuggestResponse,
+        namespace='recipes:suggest',
+        tags=lambda params: [RECIPES_LIST_TAG]
+    ),
+    methods={'get'},
+    response_model=SuggestResponse
+)
+router.add_api_route(
+    '/categories',
+    recipes_service.list_categories,
+    methods={'get'},
+    response_model=list[RecipeCategory]
+)
+router.add_api_route(
+    '/ingredients',
+    recipes_service.list_ingredients,
+    methods={'get'},
+    response_model=list[RecipeIngredient]
+)
 router.add_api_route(
     '/{recipe_id}',
-    recipes_service.get_by_id,
+    response_cache.cached(
+        recipes_service.get_by_id,
+        RecipeResponse,
+        namespace='recipes:detail',
+        tags=lambda params: [recipe_tag(params['recipe_id'])]
+    ),
     methods={'get'},
     response_model=RecipeResponse
 )
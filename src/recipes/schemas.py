@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from enum import Enum
+from pydantic import BaseModel, Field
 from src.users.schemas import User
 from src.recipes.categories.schemas import RecipeCategory
 from src.recipes.ingredients.schemas import RecipeIngredient
@@ -22,9 +23,67 @@ class RecipeResponse(RecipeCreateRequest, RecipeCreateResponse):
     ingredients: list[RecipeIngredient]
 
 
+class RecipeListItem(RecipeResponse):
+    headline: str | None = Field(None, description=(
+        'HTML: an escaped excerpt of the description with the matched words wrapped in <b></b>'
+    ))
+
+
+class FacetValue(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class CookingTimeFacet(BaseModel):
+    min: int
+    max: int | None = None
+    count: int
+
+
+class RecipeFacets(BaseModel):
+    categories: list[FacetValue]
+    ingredients: list[FacetValue]
+    cooking_time: list[CookingTimeFacet]
+
+
 class RecipeListResponse(BaseModel):
-    items: list[RecipeResponse]
-    total: int
+    items: list[RecipeListItem]
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
+    facets: RecipeFacets | None = None
+
+
+class RecipeSort(str, Enum):
+    id = 'id'
+    newest = 'newest'
+    cooking_time = 'cooking_time'
+    cooking_time_desc = 'cooking_time_desc'
+    relevance = 'relevance'
+
+
+class RecipeMatch(BaseModel):
+    id: int
+    title: str
+    cooking_time: int
+    matched: int
+    missing: list[RecipeIngredient]
+
+
+class RecipeMatchResponse(BaseModel):
+    items: list[RecipeMatch]
+
+
+class Suggestion(BaseModel):
+    id: int
+    text: str
+
+
+class SuggestResponse(BaseModel):
+    recipes: list[Suggestion]
+    categories: list[Suggestion]
+    ingredients: list[Suggestion]
 
 
 class RecipeUpdateRequest(BaseModel):
@@ -37,3 +96,8 @@ class RecipeUpdateRequest(BaseModel):
 
 class RecipeDeleteResponse(BaseModel):
     success: bool
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import html
+from sqlalchemy import Float, select, update, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from src.db.engine import engine
+from src.db.models import Recipe, RecipeCategory, RecipeIngredient, RecipeCategoryValue, RecipeIngredientValue
+from src.core.text import html_to_text
+from src.db.session import current_session
+from src.recipes.references import categories_cache, ingredients_cache
+
+SEARCH_CONFIG = 'russian'
+INDEX_RECIPES_JOB = 'recipes.index'
+# control characters mark the hits, the text itself is escaped before they become tags
+HEADLINE_START, HEADLINE_STOP = '\x02', '\x03'
+HEADLINE_OPTIONS = f'MaxFragments=2, MinWords=5, MaxWords=20, StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}'
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+async def searchable_text(title: str, description_text: str, categories: list[int], ingredients: list[int]) -> str:
+    return ' '.join([
+        title.lower(),
+        description_text.lower(),
+        *(name.lower() for name in (await categories_cache.names(categories)).values()),
+        *(name.lower() for name in (await ingredients_cache.names(ingredients)).values())
+    ])
+
+
+def weighted(value, weight: str):
+    return func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(value, '')),
+        literal_column(f"'{weight}'"),
+        type_=TSVECTOR
+    )
+
+
+def search_vector():
+    categories = (
+        select(func.string_agg(RecipeCategory.name, ' '))
+        .join(RecipeCategoryValue, RecipeCategoryValue.category_id == RecipeCategory.id)
+        .where(RecipeCategoryValue.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    ingredients = (
+        select(func.string_agg(RecipeIngredient.name, ' '))
+        .join(RecipeIngredientValue, RecipeIngredientValue.ingredient_id == RecipeIngredient.id)
+        .where(RecipeIngredientValue.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    return (
+        weighted(Recipe.title, 'A')
+        .op('||', return_type=TSVECTOR)(weighted(func.concat_ws(' ', categories, ingredients), 'B'))
+        .op('||', return_type=TSVECTOR)(weighted(Recipe.description_text, 'C'))
+    )
+
+
+def refresh_search_vector(*recipe_ids: int):
+    return update(Recipe).where(Recipe.id.in_(recipe_ids)).values(search_vector=search_vector())
+
+
+def tsquery(query: str):
+    # websearch syntax accepts any user input: quotes, "or", "-word", punctuation
+    return func.websearch_to_tsquery(SEARCH_CONFIG, query)
+
+
+def matches(query: str):
+    return Recipe.search_vector.bool_op('@@')(tsquery(query))
+
+
+def rank(query: str):
+    return func.ts_rank_cd(Recipe.search_vector, tsquery(query), type_=Float)
+
+
+def headline(query: str):
+    return func.ts_headline(SEARCH_CONFIG, Recipe.description_text, tsquery(query), HEADLINE_OPTIONS)
+
+
+def highlight(fragment: str | None) -> str | None:
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(HEADLINE_START, '<b>').replace(HEADLINE_STOP, '</b>')
+
+
+async def backfill(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    total = 0
+    while True:
+        async with current_session() as session:
+            ids = (await session.execute(
+                select(Recipe.id).where(Recipe.search_vector.is_(None)).order_by(Recipe.id).limit(batch_size)
+            )).scalars().all()
+            if not ids:
+                return total
+            await session.execute(refresh_search_vector(*ids))
+            await session.commit()
+        total += len(ids)
+
+
+async def index_recipes(*recipe_ids: int):
+    async with current_session() as session:
+        recipes = (await session.execute(
+            select(Recipe.id, Recipe.title, Recipe.description).where(Recipe.id.in_(recipe_ids))
+        )).all()
+        if not recipes:
+            return
+        categories, ingredients = {}, {}
+        for recipe_id, category_id in await session.execute(
+            select(RecipeCategoryValue.recipe_id, RecipeCategoryValue.category_id)
+            .where(RecipeCategoryValue.recipe_id.in_(recipe_ids))
+        ):
+            categories.setdefault(recipe_id, []).append(category_id)
+        for recipe_id, ingredient_id in await session.execute(
+            select(RecipeIngredientValue.recipe_id, RecipeIngredientValue.ingredient_id)
+            .where(RecipeIngredientValue.recipe_id.in_(recipe_ids))
+        ):
+            ingredients.setdefault(recipe_id, []).append(ingredient_id)
+        rows = []
+        for recipe in recipes:
+            description_text = html_to_text(recipe.description)
+            rows.append({
+                'id': recipe.id,
+                'description_text': description_text,
+                'searchable_content': await searchable_text(
+                    recipe.title, description_text,
+                    categories.get(recipe.id, []), ingredients.get(recipe.id, [])
+                )
+            })
+        await session.execute(update(Recipe), rows)
+        await session.execute(refresh_search_vector(*recipe_ids))
+        await session.commit()
+
+
+async def rebuild_searchable_content(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    total = 0
+    last_id = 0
+    while True:
+        async with current_session() as session:
+            ids = (await session.execute(
+                select(Recipe.id).where(Recipe.id > last_id).order_by(Recipe.id).limit(batch_size)
+            )).scalars().all()
+        if not ids:
+            return total
+        await index_recipes(*ids)
+        total += len(ids)
+        last_id = ids[-1]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rebuild-content', action='store_true', help='recompute searchable_content for all recipes')
+    args = parser.parse_args()
+    print(f'Search vectors backfilled: {await backfill()}')
+    if args.rebuild_content:
+        print(f'Searchable content rebuilt: {await rebuild_searchable_content()}')
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
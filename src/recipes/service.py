@@ -1,12 +1,25 @@
-import re
-from fastapi import Depends, HTTPException
-from sqlalchemy import delete, select, func, alias
-from sqlalchemy.ext.asyncio import async_sessionmaker
-from typing import Optional
-from src.db.engine import engine
+from fastapi import Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, update, delete, func, literal, union_all
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.sql import Select
+from typing import List, Optional
+from src.db.session import current_session, primary_session
 from src.core.service import BaseService
 from src.recipes.models import Recipe
-from src.recipes.schemas import RecipeCreateRequest, RecipeUpdateRequest
+from src.core.cache import response_cache
+from src.core.pagination import encode_cursor, decode_cursor, keyset_after, keyset_order
+from src.recipes.load_plans import RECIPE_DETAIL
+from src.recipes.references import categories_cache, ingredients_cache
+from src.core.streaming import RequestStreamingResponse
+from src.recipes.exporter import RecipeExporter
+from src.recipes.matching import MATCH_LIMIT, ingredient_index
+from src.recipes.suggest import SUGGEST_LIMIT, titles_index, categories_index, ingredients_index
+from src.recipes.importer import RecipeImporter
+from src.recipes.search import INDEX_RECIPES_JOB, headline, highlight, index_recipes, matches, rank
+from src.jobs.queue import job_queue
+from src.recipes.schemas import RecipeCreateRequest, RecipeUpdateRequest, RecipeSort, ExportFormat
+from src.users.models import User
 from src.users.service import user_service, oauth2_scheme
 from src.recipes.categories.models import RecipeCategory
 from src.recipes.ingredients.models import RecipeIngredient
@@ -14,7 +27,14 @@ from src.recipes.categories.values.models import RecipeCategoryValue
 from src.recipes.ingredients.values.models import RecipeIngredientValue
 
 
-HTML_CLEANER_REGEX = re.compile('<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6}|\\t);')
+DESCRIPTION_PREVIEW_LENGTH = 25
+SEARCHABLE_FIELDS = ('title', 'description', 'categories', 'ingredients')
+RECIPES_LIST_TAG = 'recipes:list'
+COOKING_TIME_BUCKETS = (15, 30, 60, 120)
+
+
+def recipe_tag(recipe_id: int) -> str:
+    return f'recipe:{recipe_id}'
 
 
 class RecipesService(BaseService):
@@ -32,103 +52,238 @@ class RecipesService(BaseService):
         del values['categories']
         del values['ingredients']
 
-        searchable_text = values['title'].lower() + ' ' + re.sub(HTML_CLEANER_REGEX, '', values['description'].lower())
-        if categories:
-            categories_rows = await super().get_list(model=RecipeCategory)
-            if categories_rows:
-                searchable_text += ' '.join(row.name.lower() for row in categories_rows if row.id in categories)
-        if ingredients:
-            ingredients_rows = await super().get_list(model=RecipeIngredient)
-            if ingredients_rows:
-                searchable_text += ' '.join(row.name.lower() for row in ingredients_rows if row.id in ingredients)
-
-        values.update({'searchable_content': searchable_text})
-
-        result = await self.create(model=Recipe, values=values)
-        if result:
-            for i in categories:
-                await self.create(model=RecipeCategoryValue, values={
-                    'recipe_id': result.id,
-                    'category_id': i
-                })
-            for i in ingredients:
-                await self.create(model=RecipeIngredientValue, values={
-                    'recipe_id': result.id,
-                    'ingredient_id': i
-                })
-            return result
-        raise HTTPException(status_code=500, detail='Unknown error on recipe service')
-
-    async def list(self, page: int = 1, page_size: int = 10):
+        categories = list(dict.fromkeys(categories))
+        ingredients = list(dict.fromkeys(ingredients))
+        await self.validate_references(categories=categories, ingredients=ingredients)
+
+        # filled in by the indexing job
+        values.update({'searchable_content': ''})
+
+        try:
+            async with self.unit_of_work() as uow:
+                result = (await uow.execute(insert(Recipe).values(values).returning(Recipe.id))).scalar_one()
+                uow.insert_many(RecipeCategoryValue, [{'recipe_id': result, 'category_id': i} for i in categories])
+                uow.insert_many(RecipeIngredientValue, [{'recipe_id': result, 'ingredient_id': i} for i in ingredients])
+                await job_queue.enqueue(uow, INDEX_RECIPES_JOB, recipe_ids=[result])
+                uow.on_commit(lambda: ingredient_index.put(result, ingredients))
+        except Exception:
+            raise HTTPException(status_code=500, detail='Unknown error on recipe service')
+        await response_cache.invalidate(RECIPES_LIST_TAG)
+        return {'id': result}
+
+    async def import_recipes(self, request: Request, token: str = Depends(oauth2_scheme)):
+        user = await user_service.get_current(token=token)
+        if not user:
+            raise HTTPException(status_code=401, detail='Unauthorized')
+        importer = RecipeImporter(author_id=user.id)
+
+        async def stream():
+            async for line in importer.run(request.stream()):
+                yield line
+            if importer.imported:
+                await response_cache.invalidate(RECIPES_LIST_TAG)
+
+        return RequestStreamingResponse(stream(), media_type='application/x-ndjson')
+
+    async def list(self, page: int | None = None, page_size: int = 10, cursor: str | None = None,
+                   sort: RecipeSort = RecipeSort.id):
         res = await self.get_list(
             limit=page_size,
-            offset=(page - 1) * page_size
+            offset=(page - 1) * page_size if page else None,
+            cursor=cursor,
+            sort=sort
         )
         return res
 
-    async def get_list(self, filters: dict | None = None, limit: int = 10, offset: int = 0):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
+    async def get_list(self, filters: dict | None = None, limit: int = 10, offset: int | None = None,
+                       cursor: str | None = None, sort: RecipeSort | None = None):
         res = []
-        total_count = 0
-        stmt = select(Recipe, func.count(Recipe.id).over().label('total_count'))
+        total_count = None
+        query = filters.get('query') if filters else None
+        if sort is None:
+            sort = RecipeSort.relevance if query else RecipeSort.id
+        stmt = (
+            select(
+                Recipe.id,
+                Recipe.title,
+                func.concat(func.left(Recipe.description, DESCRIPTION_PREVIEW_LENGTH), '...').label('description'),
+                Recipe.cooking_time,
+                Recipe.author_id,
+                User.email.label('author_email')
+            )
+            .outerjoin(User, User.id == Recipe.author_id)
+        )
         if filters:
-            if filters['categories']:
-                stmt = stmt.filter(Recipe.categories.any(RecipeCategoryValue.category_id.in_(filters['categories'])))
-            if filters['cooking_time']:
-                stmt = stmt.filter(Recipe.cooking_time == filters['cooking_time'])
-            if filters['query']:
-                stmt = stmt.filter(func.to_tsvector('russian', Recipe.searchable_content).bool_op('@@')(
-                    func.to_tsquery('russian', filters['query'].lower())
-                ))
-
-        stmt = stmt.limit(limit).offset(offset)
-
-        async with async_session() as session:
+            stmt = self.apply_filters(stmt, filters)
+
+        keys = [(Recipe.id, sort == RecipeSort.newest)]
+        if sort == RecipeSort.relevance:
+            if not query:
+                raise HTTPException(status_code=400, detail='Sorting by relevance requires a search query')
+            keys.insert(0, (rank(query), True))
+        elif sort in (RecipeSort.cooking_time, RecipeSort.cooking_time_desc):
+            # served by ix_recipes_cooking_time_id in both directions
+            descending = sort == RecipeSort.cooking_time_desc
+            keys = [(Recipe.cooking_time, descending), (Recipe.id, descending)]
+        key_labels = [f'key_{i}' for i in range(len(keys))]
+        stmt = stmt.add_columns(*(column.label(label) for (column, _), label in zip(keys, key_labels)))
+
+        if offset is not None:
+            stmt = (stmt.add_columns(func.count(Recipe.id).over().label('total_count'))
+                    .order_by(*keyset_order(keys)).limit(limit).offset(offset))
+        else:
+            if cursor:
+                types = [column.type.python_type for column, _ in keys]
+                stmt = stmt.filter(keyset_after(keys, decode_cursor(cursor, sort.value, types)))
+            else:
+                total_count = await self.estimate_count(stmt)
+            stmt = stmt.order_by(*keyset_order(keys)).limit(limit + 1)
+        if query:
+            # snippets are built for the page rows only, not for every match
+            page = stmt.subquery()
+            stmt = (
+                select(page, headline(query).label('headline'))
+                .join(Recipe, Recipe.id == page.c.id)
+                .order_by(*keyset_order([(page.c[label], desc) for (_, desc), label in zip(keys, key_labels)]))
+            )
+
+        async with current_session() as session:
             rs = await session.execute(stmt)
-            items = []
             try:
                 res = rs.all()
-                if res:
-                    for recipe, total_count in res:
-                        recipe.description = f'{recipe.description[:25]}...'
-                        items.append(recipe)
             except Exception:
                 raise HTTPException(status_code=500, detail='Internal server error')
-        if not items:
+        if not res:
             raise HTTPException(status_code=404, detail='Items not found')
+
+        next_cursor = None
+        if offset is None and len(res) > limit:
+            res = res[:limit]
+            next_cursor = encode_cursor(sort.value, [res[-1]._mapping[label] for label in key_labels])
+        if offset is not None:
+            total_count = res[0].total_count
+
+        categories, ingredients = await self.get_relations([row.id for row in res])
+        items = [{
+            'id': row.id,
+            'title': row.title,
+            'description': row.description,
+            'cooking_time': row.cooking_time,
+            'author': {'id': row.author_id, 'email': row.author_email},
+            'categories': categories.get(row.id, []),
+            'ingredients': ingredients.get(row.id, []),
+            'headline': highlight(row.headline) if query else None
+        } for row in res]
         return {
             'items': items,
-            'total': total_count
+            'total': total_count,
+            'total_estimated': offset is None and total_count is not None,
+            'next_cursor': next_cursor
         }
 
+    def apply_filters(self, stmt: Select, filters: dict) -> Select:
+        if filters.get('categories'):
+            stmt = stmt.filter(Recipe.id.in_(
+                select(RecipeCategoryValue.recipe_id)
+                .where(RecipeCategoryValue.category_id.in_(filters['categories']))
+            ))
+        if filters.get('ingredients'):
+            ingredients = set(filters['ingredients'])
+            stmt = stmt.filter(Recipe.id.in_(
+                select(RecipeIngredientValue.recipe_id)
+                .where(RecipeIngredientValue.ingredient_id.in_(ingredients))
+                .group_by(RecipeIngredientValue.recipe_id)
+                .having(func.count() == len(ingredients))
+            ))
+        if filters.get('exclude_ingredients'):
+            stmt = stmt.filter(~(
+                select(RecipeIngredientValue.recipe_id)
+                .where(
+                    RecipeIngredientValue.recipe_id == Recipe.id,
+                    RecipeIngredientValue.ingredient_id.in_(filters['exclude_ingredients'])
+                )
+                .exists()
+            ))
+        if filters.get('cooking_time'):
+            stmt = stmt.filter(Recipe.cooking_time == filters['cooking_time'])
+        if filters.get('min_time') is not None:
+            stmt = stmt.filter(Recipe.cooking_time >= filters['min_time'])
+        if filters.get('max_time') is not None:
+            stmt = stmt.filter(Recipe.cooking_time <= filters['max_time'])
+        if filters.get('author'):
+            stmt = stmt.filter(Recipe.author_id == filters['author'])
+        if filters.get('query'):
+            stmt = stmt.filter(matches(filters['query']))
+        return stmt
+
+    async def get_facets(self, filters: dict) -> dict:
+        matching = self.apply_filters(select(Recipe.id, Recipe.cooking_time), filters).cte('matching')
+        bucket = func.width_bucket(matching.c.cooking_time, array(COOKING_TIME_BUCKETS))
+        # one statement: the matching set is materialised once and grouped per facet
+        stmt = union_all(
+            select(literal('categories'), RecipeCategoryValue.category_id, func.count())
+            .join(matching, matching.c.id == RecipeCategoryValue.recipe_id)
+            .group_by(RecipeCategoryValue.category_id),
+            select(literal('ingredients'), RecipeIngredientValue.ingredient_id, func.count())
+            .join(matching, matching.c.id == RecipeIngredientValue.recipe_id)
+            .group_by(RecipeIngredientValue.ingredient_id),
+            select(literal('cooking_time'), bucket, func.count())
+            .select_from(matching)
+            .group_by(bucket)
+        )
+        counts = {'categories': {}, 'ingredients': {}, 'cooking_time': {}}
+        async with current_session() as session:
+            for facet, value, count in await session.execute(stmt):
+                counts[facet][value] = count
+        categories = await categories_cache.names(list(counts['categories']))
+        ingredients = await ingredients_cache.names(list(counts['ingredients']))
+        bounds = (0, *COOKING_TIME_BUCKETS, None)
+        return {
+            'categories': sorted(
+                ({'id': i, 'name': categories[i], 'count': count} for i, count in counts['categories'].items()
+                 if i in categories),
+                key=lambda item: (-item['count'], item['id'])
+            ),
+            'ingredients': sorted(
+                ({'id': i, 'name': ingredients[i], 'count': count} for i, count in counts['ingredients'].items()
+                 if i in ingredients),
+                key=lambda item: (-item['count'], item['id'])
+            ),
+            'cooking_time': [
+                {'min': bounds[i], 'max': bounds[i + 1], 'count': counts['cooking_time'][i]}
+                for i in sorted(counts['cooking_time'])
+            ]
+        }
+
+    async def get_relations(self, recipe_ids: list):
+        categories_stmt = (
+            select(RecipeCategoryValue.recipe_id, RecipeCategory.id, RecipeCategory.name, RecipeCategory.parent_id)
+            .join(RecipeCategory, RecipeCategory.id == RecipeCategoryValue.category_id)
+            .where(RecipeCategoryValue.recipe_id.in_(recipe_ids))
+        )
+        ingredients_stmt = (
+            select(RecipeIngredientValue.recipe_id, RecipeIngredient.id, RecipeIngredient.name)
+            .join(RecipeIngredient, RecipeIngredient.id == RecipeIngredientValue.ingredient_id)
+            .where(RecipeIngredientValue.recipe_id.in_(recipe_ids))
+        )
+        categories, ingredients = {}, {}
+        async with current_session() as session:
+            for recipe_id, *row in await session.execute(categories_stmt):
+                categories.setdefault(recipe_id, []).append(dict(zip(('id', 'name', 'parent_id'), row)))
+            for recipe_id, *row in await session.execute(ingredients_stmt):
+                ingredients.setdefault(recipe_id, []).append(dict(zip(('id', 'name'), row)))
+        return categories, ingredients
+
     async def get_by_id(self, recipe_id: int):
-        recipe = await self.get_one(model=Recipe, filter={'id': recipe_id})
+        recipe = await self.get_one(model=Recipe, filter={'id': recipe_id}, options=RECIPE_DETAIL)
         if not recipe:
             raise HTTPException(status_code=404, detail='Recipe not found')
         return recipe
 
-    async def delete_category(self, recipe_id: int, cat_id: int):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
-        stmt = (delete(RecipeCategoryValue)
-                .where(RecipeCategoryValue.recipe_id == recipe_id)
-                .where(RecipeCategoryValue.category_id == cat_id)
-                )
-        async with async_session() as session:
-            await session.execute(stmt)
-            await session.commit()
-
-    async def delete_ingredient(self, recipe_id: int, ingr_id: int):
-        async_session = async_sessionmaker(engine, expire_on_commit=False)
-        stmt = (delete(RecipeIngredientValue)
-                .where(RecipeIngredientValue.recipe_id == recipe_id)
-                .where(RecipeIngredientValue.ingredient_id == ingr_id)
-                )
-        async with async_session() as session:
-            await session.execute(stmt)
-            await session.commit()
-
     async def update_recipe(self, recipe_id: int, data: RecipeUpdateRequest, token: str = Depends(oauth2_scheme)):
-        current_recipe = await self.get_by_id(recipe_id=recipe_id)
+        # the link diff below must be computed against the primary, not a lagging replica
+        async with primary_session():
+            current_recipe = await self.get_by_id(recipe_id=recipe_id)
         user = await user_service.get_current(token=token)
         if not user:
             raise HTTPException(status_code=401, detail='Unauthorized')
@@ -136,74 +291,173 @@ class RecipesService(BaseService):
             raise HTTPException(status_code=403, detail='Access denied. You can edit only your own recipes')
 
         values = data.model_dump()
+        for field in ('categories', 'ingredients'):
+            if values[field]:
+                values[field] = list(dict.fromkeys(values[field]))
+        await self.validate_references(categories=values['categories'], ingredients=values['ingredients'])
         new_values = {}
         current_categories = list(map(lambda item: item.id, current_recipe.categories))
         current_ingredients = list(map(lambda item: item.id, current_recipe.ingredients))
-        for field in values:
-            if not values[field]:
-                continue
-
-            if field == 'categories':
-                for i in values[field]:
-                    if i in current_categories:
-                        continue
-                    await self.create(model=RecipeCategoryValue, values={
-                        'recipe_id': recipe_id,
-                        'category_id': i
-                    })
-
-                for i in current_categories:
-                    if i in values[field]:
-                        continue
-                    await self.delete_category(recipe_id=recipe_id, cat_id=i)
-
-            elif field == 'ingredients':
-                for i in values[field]:
-                    if i in current_ingredients:
-                        continue
-                    await self.create(model=RecipeIngredientValue, values={
-                        'recipe_id': recipe_id,
-                        'ingredient_id': i
-                    })
-
-                for i in current_ingredients:
-                    if i in values[field]:
+        try:
+            async with self.unit_of_work() as uow:
+                for field in values:
+                    if not values[field]:
                         continue
-                    await self.delete_ingredient(recipe_id=recipe_id, ingr_id=i)
 
-            else:
-                new_values[field] = values[field]
-
-        if new_values:
-            return await self.update(model=Recipe, pk=recipe_id, values=new_values)
-        raise HTTPException(status_code=500, detail='Server error')
+                    if field == 'categories':
+                        new_categories = values[field]
+                        uow.insert_many(RecipeCategoryValue, [
+                            {'recipe_id': recipe_id, 'category_id': i}
+                            for i in new_categories if i not in current_categories
+                        ])
+                        uow.delete_any(
+                            RecipeCategoryValue,
+                            RecipeCategoryValue.category_id,
+                            [i for i in current_categories if i not in new_categories],
+                            RecipeCategoryValue.recipe_id == recipe_id
+                        )
+
+                    elif field == 'ingredients':
+                        new_ingredients = values[field]
+                        uow.insert_many(RecipeIngredientValue, [
+                            {'recipe_id': recipe_id, 'ingredient_id': i}
+                            for i in new_ingredients if i not in current_ingredients
+                        ])
+                        uow.delete_any(
+                            RecipeIngredientValue,
+                            RecipeIngredientValue.ingredient_id,
+                            [i for i in current_ingredients if i not in new_ingredients],
+                            RecipeIngredientValue.recipe_id == recipe_id
+                        )
+
+                    else:
+                        new_values[field] = values[field]
+
+                if new_values:
+                    uow.add(update(Recipe).where(Recipe.id == recipe_id).values(new_values))
+                if any(values[field] for field in SEARCHABLE_FIELDS):
+                    await job_queue.enqueue(uow, INDEX_RECIPES_JOB, recipe_ids=[recipe_id])
+                if values['ingredients']:
+                    uow.on_commit(lambda: ingredient_index.put(recipe_id, values['ingredients']))
+        except Exception:
+            raise HTTPException(status_code=500, detail='Server error')
+        await response_cache.invalidate(RECIPES_LIST_TAG, recipe_tag(recipe_id))
+        return await self.get_by_id(recipe_id=recipe_id)
+
+    async def validate_references(self, categories: Optional[List[int]], ingredients: Optional[List[int]]):
+        if categories:
+            await categories_cache.validate(categories)
+        if ingredients:
+            await ingredients_cache.validate(ingredients)
+
+    async def list_categories(self):
+        return list((await categories_cache.rows()).values())
+
+    async def list_ingredients(self):
+        return list((await ingredients_cache.rows()).values())
+
+    async def match(self, ingredients: List[int] = Query(min_length=1), limit: int = Query(MATCH_LIMIT, ge=1, le=100),
+                    max_missing: int | None = Query(None, ge=0)):
+        matches = await ingredient_index.match(ingredients, limit=limit, max_missing=max_missing)
+        if not matches:
+            return {'items': []}
+        async with current_session() as session:
+            recipes = {row.id: row for row in await session.execute(
+                select(Recipe.id, Recipe.title, Recipe.cooking_time)
+                .where(Recipe.id.in_([recipe_id for recipe_id, _, _ in matches]))
+            )}
+        names = await ingredients_cache.names(list({i for _, _, missing in matches for i in missing}))
+        return {'items': [{
+            'id': recipe_id,
+            'title': recipes[recipe_id].title,
+            'cooking_time': recipes[recipe_id].cooking_time,
+            'matched': matched,
+            'missing': [{'id': i, 'name': names[i]} for i in sorted(missing) if i in names]
+        } for recipe_id, matched, missing in matches if recipe_id in recipes]}
+
+    async def suggest(self, q: str = Query(min_length=1, max_length=100),
+                      limit: int = Query(SUGGEST_LIMIT, ge=1, le=50)):
+        query = ' '.join(q.lower().split())
+        if not query:
+            return {'recipes': [], 'categories': [], 'ingredients': []}
+        return {
+            'recipes': await titles_index.search(query, limit),
+            'categories': await categories_index.search(query, limit),
+            'ingredients': await ingredients_index.search(query, limit)
+        }
 
-    async def filter(self, time: int | None = None, categories: Optional[list] = None, q: str | None = None, page: int = 1, page_size: int = 10):
-        res = await self.get_list(filters={
+    async def filter(self, time: int | None = None, min_time: int | None = None, max_time: int | None = None,
+                     categories: Optional[List[int]] = Query(None), ingredients: Optional[List[int]] = Query(None),
+                     exclude_ingredients: Optional[List[int]] = Query(None), author: int | None = None,
+                     q: str | None = None, page: int | None = None, page_size: int = 10, cursor: str | None = None,
+                     sort: RecipeSort | None = None, facets: bool = False):
+        filters = {
             'cooking_time': time,
+            'min_time': min_time,
+            'max_time': max_time,
             'categories': categories,
+            'ingredients': ingredients,
+            'exclude_ingredients': exclude_ingredients,
+            'author': author,
             'query': q
-            },
+        }
+        res = await self.get_list(
+            filters=filters,
             limit=page_size,
-            offset=(page - 1) * page_size
+            offset=(page - 1) * page_size if page else None,
+            cursor=cursor,
+            sort=sort
         )
+        if facets:
+            res['facets'] = await self.get_facets(filters)
         return res
 
+    async def export(self, format: ExportFormat = ExportFormat.ndjson, time: int | None = None,
+                     categories: Optional[List[int]] = Query(None), q: str | None = None):
+        exporter = RecipeExporter(self.apply_filters(
+            RecipeExporter.statement(),
+            {'cooking_time': time, 'categories': categories, 'query': q}
+        ))
+        if format == ExportFormat.csv:
+            return StreamingResponse(exporter.csv(), media_type='text/csv', headers={
+                'Content-Disposition': 'attachment; filename="recipes.csv"'
+            })
+        return StreamingResponse(exporter.ndjson(), media_type='application/x-ndjson', headers={
+            'Content-Disposition': 'attachment; filename="recipes.ndjson"'
+        })
+
     async def delete_recipe(self, recipe_id: int, token: str = Depends(oauth2_scheme)):
         user = await user_service.get_current(token=token)
         if not user:
             raise HTTPException(status_code=401, detail='Unauthorized')
 
-        row = await self.get_by_id(recipe_id=recipe_id)
+        async with primary_session():
+            row = await self.get_by_id(recipe_id=recipe_id)
         if not row:
             raise HTTPException(status_code=404, detail='Recipe not found')
 
         if user.id != row.author_id:
             raise HTTPException(status_code=403, detail='Access denied')
 
-        res = await self.delete(model=Recipe, pk=recipe_id)
+        res = True
+        try:
+            async with self.unit_of_work() as uow:
+                uow.add(delete(RecipeCategoryValue).where(RecipeCategoryValue.recipe_id == recipe_id))
+                uow.add(delete(RecipeIngredientValue).where(RecipeIngredientValue.recipe_id == recipe_id))
+                uow.add(delete(Recipe).where(Recipe.id == recipe_id))
+                uow.on_commit(lambda: ingredient_index.remove(recipe_id))
+        except Exception:
+            res = False
+        if res:
+            await response_cache.invalidate(RECIPES_LIST_TAG, recipe_tag(recipe_id))
 
         return {'success': res}
 
 
+async def index_recipes_job(recipe_ids: list[int]):
+    await index_recipes(*recipe_ids)
+    await response_cache.invalidate(RECIPES_LIST_TAG)
+
+
+job_queue.register(INDEX_RECIPES_JOB, index_recipes_job)
 recipes_service = RecipesService()
@@ -0,0 +1,100 @@
+import difflib
+import math
+from bisect import bisect_left, bisect_right
+from sqlalchemy import func, select, text
+from src.db.session import current_session
+from src.recipes.models import Recipe
+from src.recipes.references import ReferenceCache, categories_cache, ingredients_cache
+
+SUGGEST_LIMIT = 10
+FUZZY_CUTOFF = 0.75
+FUZZY_MIN_LENGTH = 3
+
+
+class NameIndex:
+
+    def __init__(self, cache: ReferenceCache):
+        self.cache = cache
+        self._source: dict | None = None
+        self._words: list[tuple[str, int]] = []
+        self._buckets: dict[str, list[str]] = {}
+
+    async def _index(self) -> dict[int, dict]:
+        rows = await self.cache.rows()
+        # the cache hands out a new dict on every reload
+        if rows is not self._source:
+            self._words = sorted(
+                (word, row['id']) for row in rows.values() for word in {row['name'].lower(), *row['name'].lower().split()}
+            )
+            # typo candidates by first letter, ordered by length for the window in _close
+            self._buckets = {}
+            for word in sorted({word for word, _ in self._words}, key=lambda word: (len(word), word)):
+                self._buckets.setdefault(word[0], []).append(word)
+            self._source = rows
+        return rows
+
+    def _prefixed(self, prefix: str) -> list[int]:
+        ids = []
+        for word, i in self._words[bisect_left(self._words, (prefix,)):]:
+            if not word.startswith(prefix):
+                break
+            ids.append(i)
+        return ids
+
+    def _close(self, query: str, limit: int) -> list[str]:
+        if len(query) < FUZZY_MIN_LENGTH:
+            return []
+        bucket = self._buckets.get(query[0], [])
+        # the ratio is at most 2 * min(len) / (len(query) + len(word)), longer or shorter words cannot reach the cutoff
+        shortest = math.ceil(len(query) * FUZZY_CUTOFF / (2 - FUZZY_CUTOFF))
+        longest = math.floor(len(query) * (2 - FUZZY_CUTOFF) / FUZZY_CUTOFF)
+        candidates = bucket[bisect_left(bucket, shortest, key=len):bisect_right(bucket, longest, key=len)]
+        return difflib.get_close_matches(query, candidates, n=limit, cutoff=FUZZY_CUTOFF)
+
+    async def search(self, query: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+        rows = await self._index()
+        ids = self._prefixed(query)
+        if not ids:
+            for word in self._close(query, limit):
+                ids.extend(i for w, i in self._words[bisect_left(self._words, (word,)):] if w == word)
+        ids = list(dict.fromkeys(ids))
+        return [{'id': i, 'text': rows[i]['name']} for i in sorted(ids, key=lambda i: rows[i]['name'].lower())[:limit]]
+
+
+class TitleIndex:
+
+    def __init__(self):
+        self._trigrams: bool | None = None
+
+    async def trigrams(self) -> bool:
+        if self._trigrams is None:
+            async with current_session() as session:
+                self._trigrams = bool((await session.execute(
+                    text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+                )).scalar())
+        return self._trigrams
+
+    async def search(self, query: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+        # C collation lets the btree serve both the LIKE prefix and the ORDER BY
+        title = func.lower(Recipe.title).collate('C')
+        async with current_session() as session:
+            rows = (await session.execute(
+                select(Recipe.id, Recipe.title)
+                .where(title.startswith(query, autoescape=True))
+                .order_by(title, Recipe.id)
+                .limit(limit)
+            )).all()
+            # typo tolerance only where pg_trgm is installed
+            if len(rows) < limit and await self.trigrams():
+                rows += (await session.execute(
+                    select(Recipe.id, Recipe.title)
+                    .where(func.lower(Recipe.title).op('%')(query), Recipe.id.not_in([row.id for row in rows]))
+                    .order_by(func.similarity(func.lower(Recipe.title), query).desc(), Recipe.id)
+                    .limit(limit - len(rows))
+                )).all()
+        return [{'id': row.id, 'text': row.title} for row in rows]
+
+
+titles_index = TitleIndex()
+categories_index = NameIndex(categories_cache)
+ingredients_index = NameIndex(ingredients_cache)
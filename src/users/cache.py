@@ -0,0 +1,38 @@
+import hashlib
+from dataclasses import dataclass
+from src.core.lru import TTLCache
+from src.db.config import config
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+
+
+class PrincipalCache:
+
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Principal | None:
+        return self._cache.get(self.key(token))
+
+    def set(self, token: str, principal: Principal, ttl: float):
+        self._cache.set(self.key(token), principal, ttl=ttl)
+
+    def invalidate_user(self, user_id: int | None = None, email: str | None = None):
+        self._cache.delete_where(lambda principal: principal.id == user_id or principal.email == email)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(max_size=config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_CACHE_TTL)
@@ -8,4 +8,4 @@ class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     email: Mapped[str] = mapped_column(nullable=False, unique=True)
     password: Mapped[str] = mapped_column(nullable=False)
-    recipes: Mapped[list['Recipe']] = relationship(back_populates='author', lazy='selectin')
+    recipes: Mapped[list['Recipe']] = relationship(back_populates='author', lazy='raise')
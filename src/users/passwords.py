@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.hash import argon2
+from src.db.config import config
+
+
+class PasswordHasher:
+
+    def __init__(self, workers: int, queue_size: int, timeout: float, time_cost: int, memory_cost: int,
+                 parallelism: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._hasher = argon2.using(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            # argon2-cffi releases the GIL while hashing, so threads give real parallelism
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='argon2')
+            self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail='Password hashing is overloaded, try again later',
+                headers={'Retry-After': '1'}
+            )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._hasher.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(self._hasher.verify, password, password_hash)
+
+    def needs_update(self, password_hash: str) -> bool:
+        return self._hasher.needs_update(password_hash)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+
+password_hasher = PasswordHasher(
+    workers=config.PASSWORD_HASH_WORKERS,
+    queue_size=config.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=config.PASSWORD_HASH_TIMEOUT,
+    time_cost=config.ARGON2_TIME_COST,
+    memory_cost=config.ARGON2_MEMORY_COST,
+    parallelism=config.ARGON2_PARALLELISM
+)
@@ -2,10 +2,17 @@ import os
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from passlib.hash import argon2
 from datetime import datetime, timedelta
+from sqlalchemy.orm import load_only
+from typing import Type
+from src.core.models import Base as BaseModel
 from src.core.service import BaseService
+from src.core.timing import timed
+from src.db.config import config
+from src.db.session import primary_session
+from src.users.cache import Principal, principal_cache
 from src.users.models import User
+from src.users.passwords import password_hasher
 from src.users.schemas import UserCreate, UserLogin
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/login')
@@ -22,30 +29,65 @@ class UserService(BaseService):
         return data
 
     async def register(self, data: UserCreate):
-        data.password = argon2.hash(data.password)
+        data.password = await password_hasher.hash(data.password)
         result = await self.create(model=User, values=data.model_dump())
         if result:
             return result
         raise HTTPException(status_code=500, detail='Unknown error on user service')
 
     async def login(self, data: UserLogin):
-        user = await self.get_one(model=User, filter={'email': data.email})
+        # a user who has just registered may not be on the replicas yet
+        async with primary_session():
+            user = await self.get_one(model=User, filter={'email': data.email})
         if not user:
             raise HTTPException(status_code=404, detail='User not found')
-        if argon2.verify(data.password, user.password):
+        if await password_hasher.verify(data.password, user.password):
+            if password_hasher.needs_update(user.password):
+                await self.update(model=User, values={'password': await password_hasher.hash(data.password)}, pk=user.id)
             return {'access_token': self.create_access_token(data=data.model_dump())}
         raise HTTPException(status_code=200, detail='Wrong password')
 
     async def get_current(self, token: str = Depends(oauth2_scheme)):
+        principal = principal_cache.get(token)
+        if principal:
+            return principal
         try:
-            token_data = self.decode_access_token(token)
+            with timed('jwt'):
+                token_data = self.decode_access_token(token)
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail='Access token has expired')
         except Exception as e:
             raise HTTPException(status_code=401, detail=f'Token error: {repr(e)}')
 
-        user = await self.get_one(model=User, filter={'email': token_data['email']})
+        async with primary_session():
+            user = await self.get_one(
+                model=User,
+                filter={'email': token_data['email']},
+                options=(load_only(User.id, User.email),)
+            )
+        if not user:
+            return user
+        principal = Principal(id=user.id, email=user.email)
+        principal_cache.set(token, principal, ttl=float(token_data['expire']) - datetime.now().timestamp())
+        return principal
+
+    async def get_admin(self, token: str):
+        user = await self.get_current(token=token)
+        if not user or user.email not in config.ADMIN_EMAILS:
+            raise HTTPException(status_code=403, detail='Access denied')
         return user
 
+    async def update(self, model: Type[BaseModel], values: dict, pk: int):
+        result = await super().update(model=model, values=values, pk=pk)
+        if model is User:
+            principal_cache.invalidate_user(user_id=pk)
+        return result
+
+    async def delete(self, model: Type[BaseModel], pk: int):
+        result = await super().delete(model=model, pk=pk)
+        if model is User:
+            principal_cache.invalidate_user(user_id=pk)
+        return result
+
 
 user_service = UserService()
@@ -1,12 +1,11 @@
-import random, time, string
+import logging, random, time, string
 from src.core.service import BaseService
 from src.recipes.service import recipes_service
 from src.recipes.categories.models import RecipeCategory
 from src.recipes.ingredients.models import RecipeIngredient
 from src.recipes.models import Recipe
-from src.logger import Logger
 
-logger = Logger()
+logger = logging.getLogger(__name__)
 
 
 class Seeder:
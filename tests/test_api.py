@@ -1,8 +1,26 @@
-import asyncio, pytest, os, random
+import asyncio, logging, pytest, os, random, json
+from contextlib import contextmanager
 from typing import AsyncGenerator
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
+from sqlalchemy import event, select, text
 from src.main import app
+from src.core.cache import response_cache
+from src.core.explain import Explain
+from src.core.pagination import encode_cursor
+from src.db.config import config
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from src.db.engine import engine, make_engine, replicas
+from src.db.replicas import ReplicaSet
+from src.db.session import scoped_session
+from src.db.slow_queries import slow_queries
+from src.jobs.queue import job_queue
+from src.logger import log_handler
+from src.recipes.exporter import RecipeExporter
+from src.recipes.importer import RecipeImporter
+from src.recipes.models import Recipe
+from src.recipes.service import recipes_service, recipe_tag, RECIPES_LIST_TAG
+from src.users.models import User
 from tests.seeder import Seeder as SeederClass
 from dotenv import load_dotenv
 
@@ -24,6 +42,36 @@ def event_loop(request):
     loop.close()
 
 
+@contextmanager
+def count_statements(target=engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(target.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+async def explain(stmt, conn: AsyncConnection | None = None) -> list[dict]:
+    if conn is None:
+        async with engine.connect() as conn:
+            return await explain(stmt, conn)
+    plan = (await conn.execute(Explain(stmt))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(plan_nodes(plan[0]['Plan']))
+
+
 @pytest.fixture(scope='session')
 async def ac() -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(app=app, base_url=f'http://{os.getenv('SERVER_IP_ADDRESS')}:{os.getenv('SERVER_PORT')}') as ac:
@@ -70,34 +118,14 @@ async def test_add_recipe(ac: AsyncClient):
     global access_token, recipe_id
     categories = await seeder.get_categories_ids()
     ingredients = await seeder.get_ingredients_ids()
-    used_ids = []
-    value = 0
-
     payload = {
         'title': seeder.RECIPE_TITLES[random.randint(0, len(seeder.RECIPE_TITLES) - 1)],
         'description': seeder.RECIPE_DESC[random.randint(0, len(seeder.RECIPE_DESC) - 1)],
         'cooking_time': seeder.RECIPE_COOK_TIME[random.randint(0, len(seeder.RECIPE_COOK_TIME) - 1)],
-        'categories': [],
-        'ingredients': []
+        'categories': random.sample(categories, min(len(categories), random.randint(1, 3))),
+        'ingredients': random.sample(ingredients, min(len(ingredients), random.randint(4, 12)))
     }
 
-    for i in range(0, random.randint(1, 3)):
-        if len(categories) > 1:
-            while value in used_ids:
-                value = categories[random.randint(0, len(categories) - 1)]
-        used_ids.append(value)
-        payload['categories'].append(value)
-
-    used_ids.clear()
-    value = 0
-
-    for i in range(0, random.randint(4, 12)):
-        if len(ingredients) > 1:
-            while value in used_ids:
-                value = ingredients[random.randint(0, len(ingredients) - 1)]
-        used_ids.append(value)
-        payload['ingredients'].append(value)
-
     response = await ac.post(
         '/recipes/add',
         headers={
@@ -111,6 +139,92 @@ async def test_add_recipe(ac: AsyncClient):
     recipe_id = data['id']
 
 
+async def test_add_recipe_unknown_category(ac: AsyncClient):
+    global access_token
+    response = await ac.post(
+        '/recipes/add',
+        headers={
+            'Authorization': f'Bearer {access_token}'
+        },
+        json={
+            'title': seeder.RECIPE_TITLES[0],
+            'description': seeder.RECIPE_DESC[0],
+            'cooking_time': seeder.RECIPE_COOK_TIME[0],
+            'categories': [0],
+            'ingredients': []
+        }
+    )
+    assert response.status_code == 422
+
+
+async def test_list_categories(ac: AsyncClient):
+    response = await ac.get('/recipes/categories')
+    assert response.status_code == 200
+    names = [item['name'] for item in response.json()]
+    assert set(seeder.RECIPE_CATEGORIES) <= set(names)
+
+
+async def test_import_recipes(ac: AsyncClient):
+    global access_token
+    categories = await seeder.get_categories_ids()
+    ingredients = await seeder.get_ingredients_ids()
+    items = [
+        {
+            'title': title,
+            'description': seeder.RECIPE_DESC[i % len(seeder.RECIPE_DESC)],
+            'cooking_time': seeder.RECIPE_COOK_TIME[i % len(seeder.RECIPE_COOK_TIME)],
+            'categories': random.sample(categories, 2),
+            'ingredients': random.sample(ingredients, 5)
+        } for i, title in enumerate(seeder.RECIPE_TITLES[:3])
+    ]
+    items.insert(1, {'title': 'No description'})
+    items.append({**items[0], 'title': 'Too long to cook', 'cooking_time': 2 ** 40})
+    response = await ac.post(
+        '/recipes/import',
+        headers={
+            'Authorization': f'Bearer {access_token}'
+        },
+        content='\n'.join(json.dumps(item) for item in items)
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {'imported': 3, 'failed': 2}
+    assert sorted(line['index'] for line in lines if 'id' in line) == [0, 2, 3]
+    assert [line['index'] for line in lines if 'error' in line] == [1, 4]
+
+    # a row the database refuses is rejected on its own instead of failing its whole batch
+    async with scoped_session():
+        importer = RecipeImporter(author_id=user_data['id'])
+        batch = [(i, (await importer.prepare(item))[0]) for i, item in enumerate(items) if i in (0, 2, 3)]
+        batch[1][1]['values']['cooking_time'] = 2 ** 40
+        results = await importer.flush(batch)
+    assert [result['index'] for result in results] == [0, 2, 3]
+    assert 'id' in results[0] and 'id' in results[2]
+    assert results[1]['error'].startswith('Rejected')
+    assert (importer.imported, importer.failed) == (2, 1)
+
+
+async def test_export_recipes(ac: AsyncClient):
+    response = await ac.get('/recipes/export')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert any(line['id'] == recipe_id for line in lines)
+    assert [line['id'] for line in lines] == sorted(line['id'] for line in lines)
+    assert all(line['categories'] and line['ingredients'] for line in lines)
+
+    response = await ac.get('/recipes/export', params={'format': 'csv'})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = response.text.splitlines()
+    assert rows[0].startswith('id,title,description')
+    assert len(rows) == len(lines) + 1
+
+    # one aggregate per relation, not a correlated subquery per exported column
+    nodes = await explain(RecipeExporter.statement())
+    assert not [node for node in nodes if 'Subplan Name' in node]
+    assert len([node for node in nodes if node['Node Type'] == 'Aggregate']) == 2
+
+
 async def test_update_recipe(ac: AsyncClient):
     global access_token, recipe_id
     response = await ac.patch(
@@ -129,6 +243,113 @@ async def test_update_recipe(ac: AsyncClient):
     assert data['cooking_time'] == 100
 
 
+async def test_search_index_job(ac: AsyncClient):
+    await job_queue.join()
+    response = await ac.get('/recipes/list/filter', params={'q': 'updated'})
+    assert response.status_code == 200
+    items = response.json()['items']
+    assert [item['id'] for item in items] == [recipe_id]
+    # the title hit is not part of the description excerpt
+    assert items[0]['headline'] and '<b>' not in items[0]['headline']
+
+    headers = {'Authorization': f'Bearer {access_token}'}
+    for path in ('/pool', '/caches', '/replicas', '/jobs', '/logging'):
+        response = await ac.get(f'/monitoring{path}')
+        assert response.status_code == 401
+        response = await ac.get(f'/monitoring{path}', headers=headers)
+        assert response.status_code == 403
+
+    config.ADMIN_EMAILS.append(user_data['email'])
+    try:
+        response = await ac.get('/monitoring/jobs', headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data['pending'] == 0 and data['failed'] == 0
+        assert data['processed'] >= 3
+
+        response = await ac.get('/monitoring/logging', headers=headers)
+        assert response.status_code == 200
+        assert response.json()['dropped'] == 0 and response.json()['errors'] == 0
+    finally:
+        config.ADMIN_EMAILS.remove(user_data['email'])
+
+
+async def test_search_vector_uses_extracted_text(ac: AsyncClient):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    description = (await ac.get(f'/recipes/{recipe_id}')).json()['description']
+    response = await ac.patch(f'/recipes/{recipe_id}', headers=headers, json={
+        'description': '<p>Dough&nbsp;&amp;&nbsp;salt &lt;img src=x onerror=alert(1)&gt;</p>'
+                       '<script>hidden()</script><style>.b {}</style>'
+    })
+    assert response.status_code == 200
+    await job_queue.join()
+    async with scoped_session() as session:
+        text_, vector = (await session.execute(
+            select(Recipe.description_text, Recipe.search_vector).where(Recipe.id == recipe_id)
+        )).one()
+    assert text_ == 'Dough & salt <img src=x onerror=alert(1)>'
+    assert 'dough' in vector and 'salt' in vector
+    assert not {'nbsp', 'amp', 'hidden'} & {token.split(':')[0].strip("'") for token in vector.split()}
+
+    # the excerpt keeps the original case and escapes text that reads as markup once decoded
+    response = await ac.get('/recipes/list/filter', params={'q': 'dough'})
+    assert response.status_code == 200
+    [item] = response.json()['items']
+    assert item['headline'].startswith('<b>Dough</b> &amp; salt &lt;img src=x onerror') and '<img' not in item['headline']
+
+    response = await ac.patch(f'/recipes/{recipe_id}', headers=headers, json={'description': description})
+    assert response.status_code == 200
+    await job_queue.join()
+
+
+async def test_match_recipes(ac: AsyncClient):
+    response = await ac.get(f'/recipes/{recipe_id}')
+    ingredients = [item['id'] for item in response.json()['ingredients']]
+    response = await ac.get('/recipes/match', params={'ingredients': ingredients, 'max_missing': 0})
+    assert response.status_code == 200
+    items = response.json()['items']
+    assert recipe_id in [item['id'] for item in items]
+    assert all(item['missing'] == [] for item in items)
+
+    response = await ac.get('/recipes/match', params={'ingredients': ingredients[:1]})
+    assert response.status_code == 200
+    items = response.json()['items']
+    missing = [len(item['missing']) for item in items]
+    assert missing == sorted(missing)
+    assert all(item['matched'] == 1 for item in items)
+
+
+async def test_suggest(ac: AsyncClient):
+    response = await ac.get('/recipes/suggest', params={'q': 'Recipe '})
+    assert response.status_code == 200
+    assert recipe_id in [item['id'] for item in response.json()['recipes']]
+
+    response = await ac.get('/recipes/suggest', params={'q': seeder.RECIPE_INGREDIENTS[0][:3]})
+    assert response.status_code == 200
+    assert seeder.RECIPE_INGREDIENTS[0] in [item['text'] for item in response.json()['ingredients']]
+
+    # one typo
+    response = await ac.get('/recipes/suggest', params={'q': 'ужен'})
+    assert response.status_code == 200
+    assert 'Ужин' in [item['text'] for item in response.json()['categories']]
+
+
+async def test_search_ranked(ac: AsyncClient):
+    response = await ac.get('/recipes/list/filter', params={'q': 'борщ & (рецепт', 'page_size': 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert all(item['headline'] for item in data['items'])
+    seen = [item['id'] for item in data['items']]
+    while data['next_cursor']:
+        response = await ac.get('/recipes/list/filter', params={
+            'q': 'борщ & (рецепт', 'page_size': 2, 'cursor': data['next_cursor']
+        })
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(item['id'] for item in data['items'])
+    assert len(seen) == len(set(seen))
+
+
 async def test_get_recipe(ac: AsyncClient):
     global recipe_id
     response = await ac.get(f'/recipes/{recipe_id}')
@@ -140,6 +361,332 @@ async def test_get_recipe(ac: AsyncClient):
     assert 'description' in data
 
 
+async def test_get_recipe_statements_count(ac: AsyncClient):
+    global recipe_id
+    await response_cache.invalidate(recipe_tag(recipe_id))
+    with count_statements() as statements:
+        response = await ac.get(f'/recipes/{recipe_id}')
+    assert response.status_code == 200
+    # recipe joined with its author, then one selectin query per collection
+    assert len(statements) == 3
+
+
+async def metrics(ac: AsyncClient) -> dict[str, float]:
+    response = await ac.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    return {
+        name: float(value) for name, value in
+        (line.rsplit(' ', 1) for line in response.text.splitlines() if not line.startswith('#'))
+    }
+
+
+async def test_request_timing(ac: AsyncClient):
+    global recipe_id
+    await response_cache.invalidate(recipe_tag(recipe_id))
+    before = await metrics(ac)
+    response = await ac.get(f'/recipes/{recipe_id}')
+    assert response.status_code == 200
+    timing = {metric.split(';')[0]: metric for metric in response.headers['server-timing'].split(', ')}
+    assert timing.keys() == {'db', 'serialize', 'total'}
+    assert 'desc="3 queries"' in timing['db']
+
+    after = await metrics(ac)
+    labels = '{method="GET",route="/recipes/{recipe_id}"}'
+    for name, delta in [
+        (f'http_request_db_queries_total{labels}', 3),
+        (f'http_request_duration_seconds_count{labels}', 1),
+        ('http_requests_total{method="GET",route="/recipes/{recipe_id}",status="200"}', 1)
+    ]:
+        assert after[name] - before.get(name, 0) == delta
+
+
+async def test_get_recipe_cached(ac: AsyncClient):
+    global recipe_id
+    with count_statements() as statements:
+        response = await ac.get(f'/recipes/{recipe_id}')
+    assert response.status_code == 200
+    assert statements == []
+    response = await ac.get(f'/recipes/{recipe_id}', headers={'If-None-Match': response.headers['etag']})
+    assert response.status_code == 304
+
+
+async def test_list_recipes_statements_count(ac: AsyncClient):
+    await response_cache.invalidate(RECIPES_LIST_TAG)
+    with count_statements() as statements:
+        response = await ac.get('/recipes/list', params={'page_size': 5})
+    assert response.status_code == 200
+    # planner estimate for total inside a savepoint, page query, one query per link table
+    assert len(statements) == 6
+
+
+async def test_estimate_count_failure(ac: AsyncClient):
+    async with scoped_session() as session:
+        # constant folding makes the planner itself raise
+        assert await recipes_service.estimate_count(select(text('1 / 0'))) is None
+        assert (await session.execute(select(Recipe.id).limit(1))).scalar() is not None
+
+    response = await ac.get('/recipes/list', params={'page_size': 1})
+    data = response.json()
+    assert data['total_estimated'] and data['total'] is not None
+    response = await ac.get('/recipes/list', params={'page_size': 1, 'cursor': data['next_cursor']})
+    assert response.json()['total'] is None and not response.json()['total_estimated']
+
+
+async def test_tampered_cursor(ac: AsyncClient):
+    for path, params, sort, values in [
+        ('/recipes/list', {}, 'id', ['1']),
+        ('/recipes/list', {}, 'id', [1, 2]),
+        ('/recipes/list', {}, 'id', [True]),
+        ('/recipes/list', {'sort': 'cooking_time'}, 'cooking_time', ['fast', 1]),
+        ('/recipes/list', {'sort': 'cooking_time'}, 'cooking_time', [[10], 1]),
+        ('/recipes/list/filter', {'q': 'борщ'}, 'relevance', ['0.5', 1]),
+    ]:
+        response = await ac.get(path, params={**params, 'cursor': encode_cursor(sort, values)})
+        assert response.status_code == 400, values
+
+    # an integral rank is encoded as a JSON integer
+    response = await ac.get('/recipes/list/filter', params={'q': 'борщ', 'cursor': encode_cursor('relevance', [0, 1])})
+    assert response.status_code in (200, 404)
+
+
+async def test_filter_recipes_statements_count(ac: AsyncClient):
+    await response_cache.invalidate(RECIPES_LIST_TAG)
+    with count_statements() as statements:
+        response = await ac.get('/recipes/list/filter', params={'page': 1, 'page_size': 5, 'time': 100})
+    assert response.status_code == 200
+    assert len(statements) == 3
+
+
+async def test_filter_plans_use_indexes():
+    # the test tables are small enough for a seq scan to win anyway, so the plans are taken over seeded rows,
+    # with the filtered values as rare as they are in a real catalogue, and the rows are rolled back
+    tables = 'users, recipes, recipes_categories, recipes_ingredients, recipes_categories_values, recipes_ingredients_values'
+    try:
+        async with engine.connect() as conn:
+            async with conn.begin() as transaction:
+                for statement in [
+                    "INSERT INTO users (email, password) SELECT 'plan' || i || '@plan.seed', '' FROM generate_series(1, 500) i",
+                    "INSERT INTO recipes_categories (name) SELECT 'plan ' || i FROM generate_series(1, 2000) i",
+                    "INSERT INTO recipes_ingredients (name) SELECT 'plan ' || i FROM generate_series(1, 2000) i",
+                    "INSERT INTO recipes (title, description, cooking_time, author_id, searchable_content) "
+                    "SELECT 'plan', '', 1 + (random() * 1000)::int, (SELECT max(id) FROM users) - (random() * 499)::int, '' "
+                    "FROM generate_series(1, 10000)",
+                    "INSERT INTO recipes_categories_values "
+                    "SELECT id, (SELECT max(id) FROM recipes_categories) - (random() * 1999)::int "
+                    "FROM recipes, generate_series(1, 2) ON CONFLICT DO NOTHING",
+                    "INSERT INTO recipes_ingredients_values "
+                    "SELECT id, (SELECT max(id) FROM recipes_ingredients) - (random() * 1999)::int "
+                    "FROM recipes, generate_series(1, 3) ON CONFLICT DO NOTHING",
+                    f'ANALYZE {tables}'
+                ]:
+                    await conn.execute(text(statement))
+                for filters, order_by, index in [
+                    ({'min_time': 10, 'max_time': 60}, (Recipe.cooking_time, Recipe.id), 'ix_recipes_cooking_time_id'),
+                    ({'author': 1}, (Recipe.id,), 'ix_recipes_author_id_id'),
+                    ({'categories': [1, 2]}, (Recipe.id,), 'ix_recipes_categories_values_category_recipe'),
+                    ({'ingredients': [1, 2]}, (Recipe.id,), 'ix_recipes_ingredients_values_ingredient_recipe'),
+                    ({'exclude_ingredients': [1]}, (Recipe.id,), 'ix_recipes_ingredients_values_ingredient_recipe'),
+                ]:
+                    stmt = recipes_service.apply_filters(select(Recipe.id), filters).order_by(*order_by).limit(10)
+                    nodes = await explain(stmt, conn)
+                    assert not [node for node in nodes if node['Node Type'] == 'Seq Scan'], filters
+                    assert index in [node.get('Index Name') for node in nodes], filters
+                await transaction.rollback()
+    finally:
+        # the row counts ANALYZE records survive the rollback
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level='AUTOCOMMIT')
+            await conn.execute(text(f'ANALYZE {tables}'))
+
+
+async def test_filter_recipes_ranges(ac: AsyncClient):
+    response = await ac.get('/recipes/list/filter', params={
+        'min_time': 30, 'max_time': 120, 'author': user_data['id'], 'sort': 'cooking_time_desc', 'page_size': 100
+    })
+    assert response.status_code == 200
+    items = response.json()['items']
+    times = [item['cooking_time'] for item in items]
+    assert times == sorted(times, reverse=True)
+    assert all(30 <= time <= 120 for time in times)
+    assert all(item['author']['id'] == user_data['id'] for item in items)
+
+    ingredients = [item['id'] for item in items[0]['ingredients']][:2]
+    response = await ac.get('/recipes/list/filter', params={'ingredients': ingredients, 'page_size': 100})
+    assert response.status_code == 200
+    assert all(set(ingredients) <= {i['id'] for i in item['ingredients']} for item in response.json()['items'])
+
+    # every recipe may share the excluded ingredient, leaving nothing to list
+    response = await ac.get('/recipes/list/filter', params={'exclude_ingredients': ingredients[:1], 'page_size': 100})
+    assert response.status_code in (200, 404)
+    excluded = response.json().get('items', [])
+    assert all(ingredients[0] not in {i['id'] for i in item['ingredients']} for item in excluded)
+    assert items[0]['id'] not in {item['id'] for item in excluded}
+
+
+async def test_filter_recipes_facets(ac: AsyncClient):
+    response = await ac.get('/recipes/list/filter', params={'page': 1, 'time': 100, 'facets': True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['facets']['cooking_time'] == [{'min': 60, 'max': 120, 'count': data['total']}]
+    assert all(0 < facet['count'] <= data['total'] for facet in data['facets']['categories'])
+    assert data['facets']['ingredients']
+
+    response = await ac.get('/recipes/list/filter', params={'page': 1, 'time': 100})
+    assert response.json()['facets'] is None
+
+
+async def test_slow_queries(ac: AsyncClient):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = await ac.get('/monitoring/slow-queries', headers=headers)
+    assert response.status_code == 403
+
+    config.ADMIN_EMAILS.append(user_data['email'])
+    try:
+        response = await ac.patch('/monitoring/slow-queries', headers=headers, json={
+            'enabled': True, 'threshold_ms': 0, 'explain_rate': 1
+        })
+        assert response.status_code == 200 and response.json()['enabled']
+        await response_cache.invalidate(RECIPES_LIST_TAG)
+        response = await ac.get('/recipes/list/filter', params={'q': 'updated', 'time': 100})
+        assert response.status_code == 200
+        await slow_queries.join()
+        response = await ac.patch('/monitoring/slow-queries', headers=headers, json={'enabled': False})
+        assert not response.json()['enabled'] and response.json()['recorded'] > 0
+
+        response = await ac.get('/monitoring/slow-queries', headers=headers, params={'limit': 1000})
+        assert response.status_code == 200
+        items = response.json()['items']
+        [search] = [
+            item for item in items if item['statement'].startswith('SELECT') and 'websearch_to_tsquery' in item['statement']
+        ]
+        assert '$1' not in search['statement'] and '<str:7>' in search['parameters'] and 100 in search['parameters']
+        [explained] = [item for item in items if item['explained']]
+        assert explained['statement'].startswith('SELECT')
+
+        response = await ac.get(f'/monitoring/slow-queries/{explained["id"]}', headers=headers)
+        assert response.status_code == 200
+        plan = response.json()['plan']
+        assert 'Execution Time' in plan and 'Shared Hit Blocks' in plan['Plan']
+
+        response = await ac.get('/monitoring/slow-queries', headers=headers, params={
+            'fingerprint': search['fingerprint']
+        })
+        assert {item['fingerprint'] for item in response.json()['items']} == {search['fingerprint']}
+
+        response = await ac.delete('/monitoring/slow-queries', headers=headers)
+        assert response.json()['size'] == 0
+        response = await ac.get(f'/monitoring/slow-queries/{explained["id"]}', headers=headers)
+        assert response.status_code == 404
+
+        # the email lands in the index condition or filter of an unscrubbed plan
+        slow_queries.enable()
+        async with scoped_session() as session:
+            await session.execute(select(User.id).where(User.email == user_data['email']))
+        await slow_queries.join()
+        slow_queries.disable()
+        [lookup] = [entry for entry in slow_queries.entries if entry['explained']]
+        plan = json.dumps(lookup['plan'])
+        assert ('Index Cond' in plan or 'Filter' in plan) and user_data['email'] not in plan
+    finally:
+        slow_queries.disable()
+        config.ADMIN_EMAILS.remove(user_data['email'])
+
+
+async def test_replica_lag_check():
+    # functions in a schema searched before pg_catalog stand in for a standby's WAL state
+    async with engine.begin() as conn:
+        for statement in [
+            'CREATE SCHEMA replica_state',
+            'CREATE TABLE replica_state.wal (received pg_lsn, replayed pg_lsn, replayed_at timestamptz)',
+            "INSERT INTO replica_state.wal VALUES ('0/10', '0/10', now() - interval '1 hour')",
+            'CREATE FUNCTION replica_state.pg_last_wal_receive_lsn() RETURNS pg_lsn '
+            'LANGUAGE sql AS $$ SELECT received FROM replica_state.wal $$',
+            'CREATE FUNCTION replica_state.pg_last_wal_replay_lsn() RETURNS pg_lsn '
+            'LANGUAGE sql AS $$ SELECT replayed FROM replica_state.wal $$',
+            'CREATE FUNCTION replica_state.pg_last_xact_replay_timestamp() RETURNS timestamptz '
+            'LANGUAGE sql AS $$ SELECT replayed_at FROM replica_state.wal $$'
+        ]:
+            await conn.execute(text(statement))
+    standby = create_async_engine(config.url(), connect_args={
+        'server_settings': {'search_path': 'replica_state, pg_catalog, public'}
+    })
+    checked = ReplicaSet([standby], health_interval=5, max_lag=10)
+    try:
+        # no writes on the primary for an hour, but everything received is replayed
+        await checked.check()
+        assert checked.stats()[0]['healthy'] and checked.stats()[0]['lag'] == 0
+
+        async with engine.begin() as conn:
+            await conn.execute(text("UPDATE replica_state.wal SET received = '0/20'"))
+        await checked.check()
+        assert not checked.stats()[0]['healthy'] and checked.stats()[0]['lag'] >= 3600
+    finally:
+        await standby.dispose()
+        async with engine.begin() as conn:
+            await conn.execute(text('DROP SCHEMA replica_state CASCADE'))
+
+
+async def test_replica_routing(ac: AsyncClient):
+    # a second engine on the same server stands in for a streaming replica
+    replica = make_engine(config.url())
+    replicas.configure([replica])
+    try:
+        await replicas.check()
+        assert replicas.stats()[0]['healthy']
+        # the writes of earlier tests would pin these reads to the primary
+        response_cache._invalidated_at.clear()
+        # dropping the entry without a write behind it, invalidate() would pin the rebuild to the primary
+        await response_cache.backend.invalidate_tags(recipe_tag(recipe_id))
+        with count_statements() as primary_statements, count_statements(replica) as replica_statements:
+            response = await ac.get(f'/recipes/{recipe_id}')
+        assert response.status_code == 200
+        assert primary_statements == [] and len(replica_statements) == 3
+
+        await response_cache.backend.invalidate_tags(RECIPES_LIST_TAG)
+        with count_statements() as primary_statements, count_statements(replica) as replica_statements:
+            response = await ac.get('/recipes/list', params={'page_size': 5})
+        assert response.status_code == 200 and response.json()['total_estimated']
+        assert primary_statements == [] and any(statement.startswith('EXPLAIN') for statement in replica_statements)
+
+        with count_statements() as primary_statements, count_statements(replica) as replica_statements:
+            response = await ac.patch(
+                f'/recipes/{recipe_id}',
+                headers={'Authorization': f'Bearer {access_token}'},
+                json={'cooking_time': 100}
+            )
+        assert response.status_code == 200
+        assert replica_statements == []
+
+        # the replica may still hold the pre-write row, the rebuild that goes into the cache must not read it
+        with count_statements() as primary_statements, count_statements(replica) as replica_statements:
+            response = await ac.get(f'/recipes/{recipe_id}')
+        assert response.status_code == 200 and response.headers['X-Cache'] == 'MISS'
+        assert response.json()['cooking_time'] == 100
+        assert replica_statements == [] and len(primary_statements) == 3
+
+        primary_window = response_cache.primary_window
+        response_cache.primary_window = 0
+        try:
+            await response_cache.backend.invalidate_tags(recipe_tag(recipe_id))
+            with count_statements(replica) as replica_statements:
+                response = await ac.get(f'/recipes/{recipe_id}')
+            assert response.status_code == 200 and len(replica_statements) == 3
+        finally:
+            response_cache.primary_window = primary_window
+
+        replicas.healthy = [False]
+        await response_cache.backend.invalidate_tags(recipe_tag(recipe_id))
+        with count_statements(replica) as replica_statements:
+            response = await ac.get(f'/recipes/{recipe_id}')
+        assert response.status_code == 200
+        assert replica_statements == []
+    finally:
+        replicas.configure([])
+        await replica.dispose()
+    await job_queue.join()
+
+
 async def test_delete_recipe(ac: AsyncClient):
     global access_token, recipe_id
     response = await ac.delete(
@@ -149,3 +696,17 @@ async def test_delete_recipe(ac: AsyncClient):
         }
     )
     assert response.status_code == 200
+
+
+async def test_logging_across_lifespans():
+    # each lifespan stops the writer on shutdown, the next startup must bring it back
+    for cycle in range(2):
+        async with app.router.lifespan_context(app):
+            written = log_handler.stats()['written']
+            logging.getLogger('tests').warning('lifespan cycle %s', cycle)
+            # written by the running writer thread, not by the drain on shutdown
+            for _ in range(50):
+                if log_handler.stats()['written'] > written:
+                    break
+                await asyncio.sleep(0.1)
+            assert log_handler.stats()['written'] > written
@@ -0,0 +1,58 @@
+import asyncio, pytest, time
+from src.core.cache import CacheEntry, MemoryCacheBackend, ResponseCache
+
+
+async def test_cancelled_leader_releases_followers():
+    cache = ResponseCache(MemoryCacheBackend(max_size=10), ttl=30, stale_ttl=30)
+    started = asyncio.Event()
+
+    async def compute() -> bytes:
+        started.set()
+        await asyncio.Event().wait()
+
+    leader = asyncio.create_task(cache._load('key', compute, ()))
+    await started.wait()
+    follower = asyncio.create_task(cache._load('key', compute, ()))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(follower, timeout=1)
+    assert cache._inflight == {}
+
+
+async def test_invalidate_during_build_skips_store():
+    cache = ResponseCache(MemoryCacheBackend(max_size=10), ttl=30, stale_ttl=30)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def compute() -> bytes:
+        started.set()
+        await release.wait()
+        return b'before'
+
+    build = asyncio.create_task(cache._load('key', compute, ('tag',)))
+    await started.wait()
+    await cache.invalidate('tag')
+    release.set()
+    assert (await build).body == b'before'
+    assert await cache.backend.get('key') is None
+
+    started.clear()
+    await cache._load('key', compute, ('tag',))
+    assert (await cache.backend.get('key')).body == b'before'
+    assert cache._generations == {}
+
+
+async def test_tag_index_follows_evictions():
+    backend = MemoryCacheBackend(max_size=2)
+    for recipe_id in range(5):
+        await backend.set(f'recipe:{recipe_id}', CacheEntry(b'', '', 0, 0, (f'recipe:{recipe_id}', 'list')), ttl=30)
+    assert set(backend._tags) == {'recipe:3', 'recipe:4', 'list'}
+    assert backend._tags['list'] == {'recipe:3', 'recipe:4'}
+
+    await backend.set('short', CacheEntry(b'', '', 0, 0, ('short',)), ttl=0.01)
+    time.sleep(0.02)
+    assert await backend.get('short') is None
+    assert 'short' not in backend._tags
+
+    await backend.invalidate_tags('list')
+    assert backend._tags == {}
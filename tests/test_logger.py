@@ -0,0 +1,64 @@
+import json, logging, os
+from src.logger import BufferedJsonHandler, LogWriter
+
+
+def make_handler(tmp_path, **kwargs):
+    options = {'max_bytes': 1024 * 1024, 'backup_count': 2, 'queue_size': 100, 'batch_size': 10, 'flush_interval': 0.01}
+    writer = LogWriter(directory=str(tmp_path), filename='info', **{**options, **kwargs})
+    handler = BufferedJsonHandler(writer, sample_rates={'test.noisy': 0})
+    logger = logging.getLogger('test.logger')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    noisy = logging.getLogger('test.noisy.child')
+    noisy.setLevel(logging.INFO)
+    noisy.addHandler(handler)
+    return handler, logger, noisy
+
+
+def read_lines(tmp_path, name='info.log'):
+    [day] = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, day, name)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_json_lines(tmp_path):
+    handler, logger, noisy = make_handler(tmp_path)
+    handler.writer.start()
+    try:
+        logger.info('recipe %s created', 5, extra={'recipe_id': 5})
+        noisy.info('dropped by sampling')
+        noisy.warning('kept')
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception('boom')
+    finally:
+        handler.close()
+        logger.removeHandler(handler)
+        noisy.removeHandler(handler)
+    created, kept, boom = read_lines(tmp_path)
+    assert created['message'] == 'recipe 5 created' and created['recipe_id'] == 5
+    assert created['level'] == 'INFO' and created['logger'] == 'test.logger'
+    assert kept['message'] == 'kept'
+    assert 'ZeroDivisionError' in boom['exc']
+    assert handler.stats() | {'queued': 0} == {
+        'queued': 0, 'max_queued': 100, 'written': 3, 'dropped': 0, 'sampled': 1, 'errors': 0
+    }
+
+
+def test_rotation_and_overflow(tmp_path):
+    handler, logger, noisy = make_handler(tmp_path, max_bytes=500, queue_size=20, batch_size=1)
+    try:
+        # nothing drains the queue until the writer starts
+        for i in range(30):
+            logger.info('line %s', i)
+        assert handler.dropped == 10
+        handler.writer.start()
+    finally:
+        handler.close()
+        logger.removeHandler(handler)
+        noisy.removeHandler(handler)
+    [day] = os.listdir(tmp_path)
+    assert sorted(os.listdir(os.path.join(tmp_path, day))) == ['info.1.log', 'info.2.log', 'info.log']
+    assert all(os.path.getsize(os.path.join(tmp_path, day, name)) <= 500 for name in os.listdir(os.path.join(tmp_path, day)))
+    assert read_lines(tmp_path)[-1]['message'] == 'line 19'
@@ -0,0 +1,31 @@
+import difflib
+from src.recipes.suggest import NameIndex
+
+
+class Rows:
+
+    def __init__(self, names: list[str]):
+        self._rows = {i: {'id': i, 'name': name} for i, name in enumerate(names, 1)}
+
+    async def rows(self) -> dict[int, dict]:
+        return self._rows
+
+
+async def test_fuzzy_candidates_are_bounded(monkeypatch):
+    names = ['Ужин', 'Обед', 'Завтрак', 'Уха', 'Утка по-пекински', 'Жин', 'Ужин для всей семьи']
+    index = NameIndex(Rows(names))
+    assert [item['text'] for item in await index.search('ужен')] == ['Ужин', 'Ужин для всей семьи']
+
+    seen = []
+    get_close_matches = difflib.get_close_matches
+
+    def close_matches(word, possibilities, **kwargs):
+        seen.append(list(possibilities))
+        return get_close_matches(word, possibilities, **kwargs)
+
+    monkeypatch.setattr(difflib, 'get_close_matches', close_matches)
+    await index.search('ужен')
+    # same first letter and a length that can still reach the cutoff
+    assert seen == [['уха', 'ужин', 'утка']]
+    seen.clear()
+    assert await index.search('жк') == [] and seen == []
@@ -0,0 +1,16 @@
+from src.core.text import html_to_text
+
+
+def test_html_to_text():
+    assert html_to_text(
+        '<p>Борщ&nbsp;&amp; <b>щи</b></p><div>x<br/>y</div><script>var a = "<p>";</script>'
+        'a < b &#x41;<!-- comment --><style>p {}</style>end'
+    ) == 'Борщ & щи x y a < b Aend'
+    assert html_to_text(None) == ''
+    assert html_to_text('<a ' * 1000) == ''
+    assert html_to_text('<p>' + 'слово ' * 1000, max_length=100) == ('слово ' * 1000)[:100]
+    # inputs longer than max_length take the scanning path, it must agree with the whole-string one
+    document = '<p>Борщ&nbsp;&amp; <b>щи</b></p><p</b>x<script>var a = "<p>";</script><!-- c -->y<SCRIPT/>z' * 50
+    assert html_to_text(document, max_length=len(document)) == html_to_text(document, max_length=len(document) - 1)
+    assert html_to_text('<script>a' + '<p>' * 100_000) == ''
+    assert html_to_text('<!--' * 100_000 + 'x') == ''